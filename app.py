@@ -1,35 +1,178 @@
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO, emit, join_room
-from werkzeug.utils import secure_filename
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from flask_socketio import SocketIO, emit, join_room, disconnect
 import sqlite3
 import os
-import bcrypt
 import jwt
 import datetime
 import html
+import json
+import atexit
+import csv
+import functools
+import io
+import time
+from db import get_db, dedicated_connection
+from migrations import migrate
+import passwords
+from passwords import hash_password, check_password, needs_rehash, HashPoolBusy
+from chat_store import CHAT_MAX_MESSAGE_LENGTH, MessageWriter, RecentMessages
+from pubsub import create_client_manager
+import auth
+import encoding
+import metrics
+import ratelimit
+import read_cache
+import transfers
+import moderation
+from listing import (ADMIN_USER_FIELDS, ITEM_SORTS, admin_users_sort, build_admin_users_filter,
+                     build_admin_users_query, build_items_query, build_search_query, make_item_cursor,
+                     parse_admin_users_cursor, parse_item_cursor, parse_item_fields)
+from uploads import UPLOAD_FOLDER, MAX_UPLOAD_BYTES, UploadError, save_image, add_cache_headers
 
 app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# 여러 워커 프로세스로 실행할 때 emit 을 공유할 메시지 큐 (예: sqlite:///tinyshop_pubsub.db, redis://...)
+SOCKETIO_QUEUE = os.environ.get('TINYSHOP_SOCKETIO_QUEUE', '')
+client_manager = create_client_manager(SOCKETIO_QUEUE)
+# jsonify / Socket.IO 패킷 인코딩 (orjson 이 있으면 사용, 선택적으로 msgpack 직렬화)
+encoding.configure(app)
+if client_manager is not None:
+    socketio = SocketIO(app, cors_allowed_origins="*", client_manager=client_manager, **encoding.socketio_options())
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*", **encoding.socketio_options())
+passwords.configure(socketio.async_mode)
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'static/uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# 요청 본문 크기 상한 (이미지 상한 + 폼 필드 여유분). 넘으면 본문을 읽기 전에 413
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024
 
 SECRET_KEY = 'your-secret-key'
-DB_PATH = os.path.join(os.path.dirname(__file__), 'tinyshop.db')
+# 검증된 토큰 캐시 + 메모리 정지 목록 (REST/Socket.IO 공통)
+token_auth = auth.TokenAuth(SECRET_KEY)
+auth.register_metrics(token_auth)
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# 시작 시 미적용 스키마 마이그레이션 실행
+with get_db() as conn:
+    migrate(conn)
+    token_auth.load_suspended(conn)
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+# 채팅 메시지는 백그라운드 작성기가 묶어서 기록 (종료 시 남은 메시지 flush)
+message_writer = MessageWriter()
+message_writer.start()
+atexit.register(message_writer.stop)
+recent_messages = RecentMessages(writer=message_writer)
 
-def check_password(password, hashed):
-    if isinstance(hashed, str):
-        hashed = hashed.encode('utf-8')
-    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+# 상품 상세 / 프로필 읽기 캐시. 쓰기 경로에서 키 단위로 무효화하고 다른 워커에도 알린다
+read_caches = {
+    'item': read_cache.TTLCache('item'),
+    'user': read_cache.TTLCache('user'),
+}
+# 무효화/정지 알림은 아무도 들어가지 않는 방으로 emit 해서 Socket.IO 메시지 큐로만 전달된다
+CACHE_INVALIDATE_EVENT = 'cache_invalidate'
+USER_SUSPENDED_EVENT = 'user_suspended'
+CHAT_COMMITTED_EVENT = 'chat_committed'
+INTERNAL_ROOM = '__internal__'
+
+def invalidate_cached(cache, *keys):
+    for key in keys:
+        read_caches[cache].invalidate(key)
+    if client_manager is not None:
+        socketio.emit(CACHE_INVALIDATE_EVENT, {'cache': cache, 'keys': list(keys)}, to=INTERNAL_ROOM)
+
+# 인증된 소켓 연결: sid -> user_id
+socket_users = {}
+
+def apply_suspension(user_id):
+    # 이 워커에서 바로 차단: 토큰 거부, 프로필 캐시 제거, 열려 있는 소켓 종료
+    token_auth.suspend(user_id)
+    read_caches['user'].invalidate(user_id)
+    for sid, uid in list(socket_users.items()):
+        if uid == user_id:
+            socketio.server.disconnect(sid, namespace='/')
+
+def suspend_everywhere(user_id):
+    apply_suspension(user_id)
+    if client_manager is not None:
+        socketio.emit(USER_SUSPENDED_EVENT, {'user_id': user_id}, to=INTERNAL_ROOM)
+
+def announce_committed(batch):
+    # 다른 워커의 채팅 버퍼는 이 워커의 메시지를 모르므로, DB 에 커밋된 뒤에 방 목록을 알린다
+    # (전달 시점에 알리면 상대 워커가 커밋 전 DB 로 다시 채워 그 메시지를 놓칠 수 있다)
+    rooms = sorted({get_chat_room(entry['sender_id'], entry['receiver_id']) for entry in batch})
+    socketio.emit(CHAT_COMMITTED_EVENT, {'rooms': rooms}, to=INTERNAL_ROOM)
+
+if client_manager is not None:
+    message_writer.on_commit = announce_committed
+
+def handle_remote_emit(message):
+    event = message.get('event')
+    if event not in (CACHE_INVALIDATE_EVENT, USER_SUSPENDED_EVENT, CHAT_COMMITTED_EVENT):
+        return
+    # emit 인자는 목록으로 전달된다
+    data = message.get('data')
+    data = (data[0] if data else {}) if isinstance(data, list) else (data or {})
+    if event == USER_SUSPENDED_EVENT:
+        apply_suspension(data.get('user_id'))
+        return
+    if event == CHAT_COMMITTED_EVENT:
+        # 다음 조회 때 커밋된 메시지가 포함된 DB 내용으로 다시 채운다
+        for room in data.get('rooms') or ():
+            recent_messages.discard(room)
+        return
+    cache = read_caches.get(data.get('cache'))
+    for key in (data.get('keys') or []) if cache else ():
+        cache.invalidate(key)
+
+if client_manager is not None:
+    client_manager.on_remote_emit = handle_remote_emit
+    # 메시지 큐 수신은 보통 첫 소켓 연결 때 시작되므로, 캐시 무효화를 바로 받도록 미리 시작
+    socketio.server.manager_initialized = True
+    client_manager.initialize()
+
+HISTORY_DEFAULT_LIMIT = 50
+
+# 신고 누적에 따른 자동 조치(정지/삭제)는 백그라운드 작업자가 처리
+moderation_worker = moderation.ModerationWorker()
+
+def on_moderation_action(action, target_id):
+    if action == 'suspend_user':
+        suspend_everywhere(target_id)
+    elif action == 'delete_item':
+        invalidate_cached('item', target_id)
+
+moderation_worker.listeners.append(on_moderation_action)
+moderation_worker.start()
+atexit.register(moderation_worker.stop)
+
+def busy_response():
+    res = jsonify({'success': False, 'error': '요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.'})
+    res.headers['Retry-After'] = '1'
+    return res, 503
+
+def rate_limited_response(retry_after):
+    res = jsonify({'success': False, 'error': '요청이 너무 잦습니다. 잠시 후 다시 시도해주세요.'})
+    res.headers['Retry-After'] = str(retry_after)
+    return res, 429
+
+# 사용자/IP 별 토큰 버킷 + 쓰기 요청 동시 처리 수 제한 (DB 잠금 대기가 쌓이기 전에 503 으로 거절)
+rate_limiter = ratelimit.RateLimiter()
+write_gate = ratelimit.WriteGate()
+# (메서드, 라우트 규칙) -> (제한 규칙, 'user' 면 사용자 단위 / 'ip' 면 IP 단위)
+RATE_LIMITED_ROUTES = {
+    ('POST', '/login'): ('login', 'ip'),
+    ('POST', '/register'): ('register', 'ip'),
+    ('POST', '/items'): ('item_write', 'user'),
+    ('PUT', '/items/<int:item_id>'): ('item_write', 'user'),
+    ('DELETE', '/items/<int:item_id>'): ('item_write', 'user'),
+    ('POST', '/report'): ('report', 'user'),
+    ('POST', '/transfer'): ('transfer', 'user'),
+    ('POST', '/transfer/batch'): ('transfer', 'user'),
+}
+WRITE_METHODS = frozenset(['POST', 'PUT', 'DELETE'])
+# 로그인/가입은 해시 작업 풀이 따로 대기열 상한을 두고 있어 쓰기 게이트에서 제외
+WRITE_GATE_EXEMPT = frozenset(['/login', '/register'])
+metrics.Gauge('tinyshop_write_gate_active', '처리 중인 쓰기 요청 수', fn=lambda: write_gate.active)
+metrics.Gauge('tinyshop_write_gate_limit', '동시 쓰기 요청 상한', fn=lambda: write_gate.limit)
 
 def generate_token(user_id, is_admin):
     payload = {
@@ -40,14 +183,98 @@ def generate_token(user_id, is_admin):
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
 def verify_token(request):
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return None
-    token = auth_header.split(' ')[1]
-    try:
-        return jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-    except:
+    # 정지된 사용자의 토큰은 만료 전이라도 거부
+    token = auth.bearer_token(request)
+    return token_auth.decode(token) if token else None
+
+@app.after_request
+def upload_cache_headers(response):
+    return add_cache_headers(response, request.path)
+
+# Accept-Encoding 협상으로 gzip/brotli 압축 (작은 응답은 그대로)
+@app.after_request
+def compress_response(response):
+    return encoding.compress_response(response, request)
+
+# 요청별 처리 시간/상태 코드 (라우트 규칙 단위로 집계해 라벨 수를 제한)
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def throttle_request():
+    if request.url_rule is None or request.path == '/metrics':
         return None
+    ip = ratelimit.client_ip(request)
+    retry_after = rate_limiter.check('ip', ip)
+    if retry_after:
+        return rate_limited_response(retry_after)
+    limited = RATE_LIMITED_ROUTES.get((request.method, request.url_rule.rule))
+    if limited:
+        rule, scope = limited
+        payload = verify_token(request) if scope == 'user' else None
+        # 토큰이 없거나 잘못된 요청은 IP 단위로 센다 (어차피 401 이지만 검사 비용을 제한)
+        key = payload['user_id'] if payload else f'ip:{ip}'
+        retry_after = rate_limiter.check(rule, key)
+        if retry_after:
+            return rate_limited_response(retry_after)
+    if request.method in WRITE_METHODS and request.url_rule.rule not in WRITE_GATE_EXEMPT:
+        if not write_gate.enter():
+            return busy_response()
+        g.write_slot = True
+    return None
+
+@app.teardown_request
+def release_write_slot(exc):
+    if g.pop('write_slot', False):
+        write_gate.leave()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_latency.observe(time.perf_counter() - start, request.method, route)
+        metrics.http_requests.inc(request.method, route, str(response.status_code))
+    return response
+
+def socketio_rooms():
+    # 이 워커에 연결된 소켓 기준 (다른 워커의 방은 포함되지 않음)
+    return socketio.server.manager.rooms.get('/', {}) if socketio.server else {}
+
+metrics.Gauge('tinyshop_socketio_connected_clients', '연결된 Socket.IO 클라이언트 수',
+              fn=lambda: len(socketio_rooms().get(None, ())))
+metrics.Gauge('tinyshop_socketio_chat_rooms', '참가자가 있는 채팅방 수',
+              fn=lambda: sum(1 for room in list(socketio_rooms()) if isinstance(room, str) and room.startswith('room_')))
+metrics.Gauge('tinyshop_chat_write_queue', '기록 대기 중인 채팅 메시지 수', fn=message_writer.pending)
+
+def instrumented(event):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.socketio_events.inc(event)
+                metrics.socketio_latency.observe(time.perf_counter() - start, event)
+        return wrapper
+    return decorator
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.scrape_allowed(request):
+        return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/config', methods=['GET'])
+def client_config():
+    # UI 서버가 채팅 페이지를 만들 때 이 서버의 Socket.IO 직렬화 방식을 따르도록 알려준다
+    return jsonify({'success': True, 'socketio_serializer': encoding.SOCKETIO_SERIALIZER})
+
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({'success': False, 'error': '업로드 크기 제한을 초과했습니다.'}), 413
 
 @app.route('/')
 def index():
@@ -60,13 +287,15 @@ def register():
     password = data.get('password')
     if not email or not password:
         return jsonify({'success': False, 'error': '이메일과 비밀번호는 필수입니다.'}), 400
-    hashed = hash_password(password)
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, hashed))
-        conn.commit()
-        conn.close()
+        hashed = hash_password(password)
+    except HashPoolBusy:
+        return busy_response()
+    try:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, hashed))
+            conn.commit()
         return jsonify({'success': True})
     except sqlite3.IntegrityError:
         return jsonify({'success': False, 'error': '이미 등록된 이메일입니다.'}), 409
@@ -76,27 +305,62 @@ def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM users WHERE email = ?', (email,))
-    user = cur.fetchone()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT * FROM users WHERE email = ?', (email,))
+        user = cur.fetchone()
     if not user:
         return jsonify({'success': False, 'error': '등록되지 않은 이메일입니다.'}), 404
     if user['is_suspended']:
         return jsonify({'success': False, 'error': '정지된 계정입니다.'}), 403
-    if not check_password(password, user['password_hash']):
-        return jsonify({'success': False, 'error': '비밀번호가 일치하지 않습니다.'}), 401
+    try:
+        if not check_password(password, user['password_hash']):
+            return jsonify({'success': False, 'error': '비밀번호가 일치하지 않습니다.'}), 401
+    except HashPoolBusy:
+        return busy_response()
+    if needs_rehash(user['password_hash']):
+        # 비용 계수가 바뀌었으면 로그인 성공 시 새 해시로 교체 (풀이 바쁘면 다음 로그인으로 미룸)
+        try:
+            rehashed = hash_password(password)
+            with get_db() as conn:
+                conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (rehashed, user['id']))
+                conn.commit()
+        except HashPoolBusy:
+            pass
+    elif isinstance(user['password_hash'], bytes):
+        # 이전 가입 경로가 bytes(BLOB) 로 저장한 해시는 같은 값의 str 로 바꿔 둔다
+        with get_db() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                         (user['password_hash'].decode('utf-8'), user['id']))
+            conn.commit()
     token = generate_token(user['id'], user['is_admin'])
     return jsonify({'success': True, 'token': token})
 
+# 가격은 0 이상의 정수 (가격 정렬 커서가 정수 키를 전제로 한다). "1,000" 같은 문자열은 숫자로 바꾼다
+MAX_ITEM_PRICE = 10 ** 12
+INVALID_PRICE_ERROR = f'가격은 0~{MAX_ITEM_PRICE} 사이의 정수여야 합니다.'
+
+def parse_price(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str):
+        value = value.strip().replace(',', '')
+        if not value.isdigit():
+            return None
+        value = int(value)
+    if not isinstance(value, int) or not 0 <= value <= MAX_ITEM_PRICE:
+        return None
+    return value
+
 @app.route('/items', methods=['POST'])
 def create_item():
     payload = verify_token(request)
     if not payload:
         return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
 
-    title = description = price = image_url = None
+    title = description = price = image_url = file = None
 
     if request.content_type.startswith('application/json'):
         data = request.get_json()
@@ -108,41 +372,225 @@ def create_item():
         description = html.escape(request.form.get('description', ''))
         price = request.form.get('price')
         file = request.files.get('image')
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(path)
-            image_url = f"/static/uploads/{filename}"
 
-    if not title or not price:
+    if not title or price in (None, ''):
         return jsonify({'success': False, 'error': '상품명과 가격은 필수입니다.'}), 400
+    price = parse_price(price)
+    if price is None:
+        return jsonify({'success': False, 'error': INVALID_PRICE_ERROR}), 400
+
+    if file and file.filename:
+        # 내용 해시(SHA-256) 경로에 저장 - 같은 이미지는 한 번만 저장되고 URL 은 바뀌지 않는다
+        try:
+            image_url = save_image(file, app.config['UPLOAD_FOLDER'])
+        except UploadError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('''INSERT INTO items (title, description, price, seller_id, image_url) VALUES (?, ?, ?, ?, ?)''', (title, description, price, payload['user_id'], image_url))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('''INSERT INTO items (title, description, price, seller_id, image_url) VALUES (?, ?, ?, ?, ?)''', (title, description, price, payload['user_id'], image_url))
+        conn.commit()
     return jsonify({'success': True})
 
+# ETag: 쓰기 시 트리거가 올리는 버전 카운터로 만든다 (조건부 GET 이면 본문 없이 304)
+def table_version(conn, name):
+    row = conn.execute('SELECT version FROM table_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def not_modified(etag):
+    # 압축 응답은 약한 ETag 로 나가므로 약한 비교
+    if request.if_none_match.contains_weak(etag):
+        res = Response(status=304)
+        res.set_etag(etag)
+        res.headers['Cache-Control'] = 'no-cache'
+        return res
+    return None
+
+def with_etag(res, etag):
+    res.set_etag(etag)
+    res.headers['Cache-Control'] = 'no-cache'
+    return res
+
+def items_not_modified(conn):
+    # 상품 목록류 응답의 공통 ETag 와, 조건부 GET 이 일치하면 304 응답 (아니면 None)
+    etag = f'items-{table_version(conn, "items")}'
+    return etag, not_modified(etag)
+
+def parse_limit(default, maximum):
+    # ?limit= 를 1~maximum 으로 맞춘다. 숫자가 아니면 ValueError (호출 측에서 400)
+    return min(max(int(request.args.get('limit', default)), 1), maximum)
+
+# 상품 목록: 키셋(커서) 페이지네이션 (SQL 조립은 listing.py)
+ITEMS_DEFAULT_LIMIT = 20
+ITEMS_MAX_LIMIT = 100
+# 커서가 없을 때 쓰는 id 상한 (조건 유무와 관계없이 같은 SQL 을 쓰기 위해)
+MAX_ITEM_ID = 2 ** 63 - 1
+
+def project_item(row, fields):
+    return {f: row[f] for f in fields}
+
 @app.route('/items', methods=['GET'])
 def get_items():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM items')
-    rows = cur.fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in rows])
+    sort = request.args.get('sort', 'newest')
+    if sort not in ITEM_SORTS:
+        return jsonify({'success': False, 'error': '지원하지 않는 정렬 방식입니다.'}), 400
+    fields = parse_item_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'success': False, 'error': '지원하지 않는 필드입니다.'}), 400
+    cursor = parse_item_cursor(sort, request.args.get('cursor'))
+    if cursor is False:
+        return jsonify({'success': False, 'error': '잘못된 커서입니다.'}), 400
+
+    with get_db() as conn:
+        etag, cached = items_not_modified(conn)
+    if cached:
+        return cached
+
+    if request.args.get('stream') == '1':
+        return with_etag(Response(stream_with_context(stream_items(sort, fields, cursor)), mimetype='application/json'), etag)
+
+    try:
+        limit = parse_limit(ITEMS_DEFAULT_LIMIT, ITEMS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 limit 값입니다.'}), 400
+    sql, params = build_items_query(sort, fields, cursor)
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(sql + ' LIMIT ?', params + [limit + 1])
+        rows = cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = make_item_cursor(sort, rows[-1])
+    return with_etag(jsonify({'success': True, 'items': [project_item(row, fields) for row in rows], 'next_cursor': next_cursor}), etag)
+
+def stream_items(sort, fields, cursor):
+    sql, params = build_items_query(sort, fields, cursor)
+    with dedicated_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        yield '['
+        first = True
+        while True:
+            rows = cur.fetchmany(500)
+            if not rows:
+                break
+            for row in rows:
+                yield ('' if first else ',') + encoding.dumps(project_item(row, fields))
+                first = False
+        yield ']'
+
+# 상품 검색: FTS5 + bm25 랭킹 (제목 가중치를 더 높게)
+SEARCH_TITLE_WEIGHT = 10.0
+SEARCH_DESCRIPTION_WEIGHT = 1.0
+
+def build_fts_query(q):
+    # 각 단어를 접두어 검색어로 바꾸고 AND 로 결합. FTS 문법 문자는 따옴표로 무력화
+    terms = [t.replace('"', '""') for t in q.split()]
+    return ' '.join(f'"{t}"*' for t in terms if t)
+
+@app.route('/items/search', methods=['GET'])
+def search_items():
+    match = build_fts_query(request.args.get('q', ''))
+    if not match:
+        return jsonify({'success': False, 'error': '검색어를 입력해주세요.'}), 400
+    fields = parse_item_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'success': False, 'error': '지원하지 않는 필드입니다.'}), 400
+    try:
+        limit = parse_limit(ITEMS_DEFAULT_LIMIT, ITEMS_MAX_LIMIT)
+        offset = max(int(request.args.get('cursor') or 0), 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 페이지 값입니다.'}), 400
+    with get_db() as conn:
+        etag, cached = items_not_modified(conn)
+        if cached:
+            return cached
+        cur = conn.cursor()
+        cur.execute(build_search_query(fields),
+                    (match, SEARCH_TITLE_WEIGHT, SEARCH_DESCRIPTION_WEIGHT, limit + 1, offset))
+        rows = cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(offset + limit)
+    return with_etag(jsonify({'success': True, 'items': [project_item(row, fields) for row in rows], 'next_cursor': next_cursor}), etag)
 
 @app.route('/items/<int:item_id>', methods=['GET'])
 def get_item_detail(item_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('''SELECT items.*, users.email AS seller_email FROM items JOIN users ON items.seller_id = users.id WHERE items.id = ?''', (item_id,))
-    row = cur.fetchone()
-    conn.close()
+    item_cache = read_caches['item']
+    item = item_cache.get(item_id)
+    if item is not None:
+        etag = f'item-{item_id}-{item["version"]}'
+        return not_modified(etag) or with_etag(jsonify({'success': True, 'item': item}), etag)
+    generation = item_cache.generation()
+    with get_db() as conn:
+        cur = conn.cursor()
+        # 버전만 먼저 확인해서 바뀌지 않았으면 조인 없이 304
+        cur.execute('SELECT version FROM items WHERE id = ?', (item_id,))
+        version = cur.fetchone()
+        if version:
+            cached = not_modified(f'item-{item_id}-{version[0]}')
+            if cached:
+                return cached
+        cur.execute('''SELECT items.*, users.email AS seller_email FROM items JOIN users ON items.seller_id = users.id WHERE items.id = ?''', (item_id,))
+        row = cur.fetchone()
     if not row:
         return jsonify({'success': False, 'error': '해당 상품이 존재하지 않습니다.'}), 404
-    return jsonify({'success': True, 'item': dict(row)})
+    item = dict(row)
+    item_cache.put(item_id, item, generation)
+    return with_etag(jsonify({'success': True, 'item': item}), f'item-{item_id}-{item["version"]}')
+
+# 여러 상품을 한 번에: ids=3,1,2 -> 요청한 순서대로, 없는 id 는 missing 으로
+@app.route('/items/batch', methods=['GET'])
+def get_items_batch():
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 상품 id 입니다.'}), 400
+    if not ids or len(ids) > ITEMS_MAX_LIMIT:
+        return jsonify({'success': False, 'error': f'상품 id 는 1~{ITEMS_MAX_LIMIT}개까지 요청할 수 있습니다.'}), 400
+    with get_db() as conn:
+        etag, cached = items_not_modified(conn)
+        if cached:
+            return cached
+        cur = conn.cursor()
+        # id 목록을 JSON 배열 하나로 넘겨 개수와 관계없이 같은 SQL(캐시된 문장)을 쓴다
+        cur.execute('''
+            SELECT items.*, users.email AS seller_email FROM items JOIN users ON items.seller_id = users.id
+            WHERE items.id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(ids),))
+        found = {row['id']: dict(row) for row in cur.fetchall()}
+    items = [found[i] for i in ids if i in found]
+    missing = [i for i in ids if i not in found]
+    return with_etag(jsonify({'success': True, 'items': items, 'missing': missing}), etag)
+
+# 판매자별 상품 목록 (최신순, id 키셋 페이지네이션)
+@app.route('/users/<int:seller_id>/items', methods=['GET'])
+def get_seller_items(seller_id):
+    fields = parse_item_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'success': False, 'error': '지원하지 않는 필드입니다.'}), 400
+    try:
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+        limit = parse_limit(ITEMS_DEFAULT_LIMIT, ITEMS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 페이지 값입니다.'}), 400
+    with get_db() as conn:
+        etag, cached = items_not_modified(conn)
+        if cached:
+            return cached
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT id, title, description, price, seller_id, image_url FROM items
+            WHERE seller_id = ? AND id < ? ORDER BY id DESC LIMIT ?
+        ''', (seller_id, cursor if cursor is not None else MAX_ITEM_ID, limit + 1))
+        rows = cur.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1]['id'])
+    return with_etag(jsonify({'success': True, 'items': [project_item(row, fields) for row in rows], 'next_cursor': next_cursor}), etag)
 
 @app.route('/items/<int:item_id>', methods=['PUT'])
 def update_item(item_id):
@@ -150,16 +598,18 @@ def update_item(item_id):
     if not payload:
         return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
     data = request.get_json()
-    price = data.get('price')
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT seller_id FROM items WHERE id = ?', (item_id,))
-    row = cur.fetchone()
-    if not row or row['seller_id'] != payload['user_id']:
-        return jsonify({'success': False, 'error': '본인 상품만 수정할 수 있습니다.'}), 403
-    cur.execute('UPDATE items SET price = ? WHERE id = ?', (price, item_id))
-    conn.commit()
-    conn.close()
+    price = parse_price(data.get('price'))
+    if price is None:
+        return jsonify({'success': False, 'error': INVALID_PRICE_ERROR}), 400
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT seller_id FROM items WHERE id = ?', (item_id,))
+        row = cur.fetchone()
+        if not row or row['seller_id'] != payload['user_id']:
+            return jsonify({'success': False, 'error': '본인 상품만 수정할 수 있습니다.'}), 403
+        cur.execute('UPDATE items SET price = ? WHERE id = ?', (price, item_id))
+        conn.commit()
+    invalidate_cached('item', item_id)
     return jsonify({'success': True})
 
 @app.route('/items/<int:item_id>', methods=['DELETE'])
@@ -167,39 +617,121 @@ def delete_item(item_id):
     payload = verify_token(request)
     if not payload:
         return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT seller_id FROM items WHERE id = ?', (item_id,))
-    row = cur.fetchone()
-    if not row or row['seller_id'] != payload['user_id']:
-        return jsonify({'success': False, 'error': '본인 상품만 삭제할 수 있습니다.'}), 403
-    cur.execute('DELETE FROM items WHERE id = ?', (item_id,))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT seller_id FROM items WHERE id = ?', (item_id,))
+        row = cur.fetchone()
+        if not row or row['seller_id'] != payload['user_id']:
+            return jsonify({'success': False, 'error': '본인 상품만 삭제할 수 있습니다.'}), 403
+        cur.execute('DELETE FROM items WHERE id = ?', (item_id,))
+        conn.commit()
+    invalidate_cached('item', item_id)
     return jsonify({'success': True})
 
-@app.route('/admin/users', methods=['GET'])
-def get_all_users():
+# 관리자 사용자 목록: 필터 + 키셋 페이지네이션 (SQL 조립은 listing.py)
+ADMIN_USERS_DEFAULT_LIMIT = 50
+ADMIN_USERS_MAX_LIMIT = 500
+TOP_REPORTED_LIMIT = 10
+
+def admin_required():
     payload = verify_token(request)
     if not payload or not payload.get('is_admin'):
         return jsonify({'success': False, 'error': '관리자만 접근할 수 있습니다.'}), 403
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT id, email, is_admin, is_suspended FROM users')
-    users = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return jsonify(users)
+    return None
+
+@app.route('/admin/users', methods=['GET'])
+def get_all_users():
+    denied = admin_required()
+    if denied:
+        return denied
+    try:
+        clauses, params = build_admin_users_filter(request.args)
+        keys = admin_users_sort(request.args)
+        cursor = parse_admin_users_cursor(keys, request.args.get('cursor'))
+        limit = parse_limit(ADMIN_USERS_DEFAULT_LIMIT, ADMIN_USERS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 검색 조건입니다.'}), 400
+    if cursor is not None:
+        clauses.append(f"({', '.join(keys)}) > ({', '.join('?' for _ in keys)})")
+        params.extend(cursor)
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(build_admin_users_query(clauses, keys) + ' LIMIT ?', params + [limit + 1])
+        users = [dict(row) for row in cur.fetchall()]
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = ':'.join(str(users[-1][k]) for k in keys)
+    return jsonify({'success': True, 'users': users, 'next_cursor': next_cursor})
+
+@app.route('/admin/users/export.csv', methods=['GET'])
+def export_users():
+    # 목록과 같은 필터. 커서에서 조금씩 읽어 바로 내보내므로 사용자 수와 관계없이 메모리 사용이 일정하다
+    denied = admin_required()
+    if denied:
+        return denied
+    try:
+        clauses, params = build_admin_users_filter(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 검색 조건입니다.'}), 400
+    res = Response(stream_with_context(stream_users_csv(build_admin_users_query(clauses, admin_users_sort(request.args)), params)), mimetype='text/csv')
+    res.headers['Content-Disposition'] = 'attachment; filename=users.csv'
+    return res
+
+# 스프레드시트가 수식으로 해석하는 문자로 시작하는 셀은 ' 를 붙여 문자열로 내보낸다
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_safe(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def stream_users_csv(sql, params):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(ADMIN_USER_FIELDS)
+    with dedicated_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                break
+            writer.writerows(tuple(csv_safe(value) for value in row) for row in rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+@app.route('/admin/summary', methods=['GET'])
+def admin_summary():
+    # 카운터는 트리거가 증감시키므로 COUNT(*) 없이 바로 읽는다
+    denied = admin_required()
+    if denied:
+        return denied
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT name, value FROM dashboard_counters')
+        counts = {row['name']: row['value'] for row in cur.fetchall()}
+        top_reported = {}
+        for target_type in moderation.TARGETS:
+            cur.execute(
+                'SELECT target_id, reporters, actioned FROM report_counts '
+                'WHERE target_type = ? ORDER BY reporters DESC LIMIT ?',
+                (target_type, TOP_REPORTED_LIMIT))
+            top_reported[target_type] = [dict(row) for row in cur.fetchall()]
+    return jsonify({'success': True, 'counts': counts, 'top_reported': top_reported})
 
 @app.route('/admin/suspend/<int:user_id>', methods=['POST'])
 def suspend_user(user_id):
     payload = verify_token(request)
     if not payload or not payload.get('is_admin'):
         return jsonify({'success': False, 'error': '관리자만 수행할 수 있습니다.'}), 403
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('UPDATE users SET is_suspended = 1 WHERE id = ?', (user_id,))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('UPDATE users SET is_suspended = 1 WHERE id = ?', (user_id,))
+        conn.commit()
+    suspend_everywhere(user_id)
     return jsonify({'success': True, 'message': f'{user_id}번 유저가 정지되었습니다.'})
 
 @app.route('/report', methods=['POST'])
@@ -214,19 +746,10 @@ def report():
     reason = data.get('reason', '').strip()
     if not reason or (not target_user_id and not target_item_id):
         return jsonify({'success': False, 'error': '신고 대상과 사유를 입력해주세요.'}), 400
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('''INSERT INTO reports (reporter_id, target_user_id, target_item_id, reason) VALUES (?, ?, ?, ?)''', (reporter_id, target_user_id, target_item_id, reason))
-    if target_user_id:
-        cur.execute('SELECT COUNT(*) FROM reports WHERE target_user_id = ?', (target_user_id,))
-        if cur.fetchone()[0] >= 3:
-            cur.execute('UPDATE users SET is_suspended = 1 WHERE id = ?', (target_user_id,))
-    if target_item_id:
-        cur.execute('SELECT COUNT(*) FROM reports WHERE target_item_id = ?', (target_item_id,))
-        if cur.fetchone()[0] >= 3:
-            cur.execute('DELETE FROM items WHERE id = ?', (target_item_id,))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        queued = moderation.record_report(conn, reporter_id, target_user_id, target_item_id, reason)
+    if queued:
+        moderation_worker.wake()
     return jsonify({'success': True, 'message': '신고가 접수되었습니다.'})
 
 @app.route('/transfer', methods=['POST'])
@@ -240,58 +763,174 @@ def transfer_points():
     amount = int(data.get('amount'))
     if not recipient_id or not amount or amount <= 0:
         return jsonify({'success': False, 'error': '올바른 수신자와 금액을 입력해주세요.'}), 400
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT points FROM users WHERE id = ?', (sender_id,))
-    sender_points = cur.fetchone()
-    if not sender_points or sender_points['points'] < amount:
-        return jsonify({'success': False, 'error': '포인트가 부족합니다.'}), 403
-    cur.execute('SELECT id FROM users WHERE id = ?', (recipient_id,))
-    if not cur.fetchone():
-        return jsonify({'success': False, 'error': '수신자를 찾을 수 없습니다.'}), 404
-    cur.execute('UPDATE users SET points = points - ? WHERE id = ?', (amount, sender_id))
-    cur.execute('UPDATE users SET points = points + ? WHERE id = ?', (amount, recipient_id))
-    conn.commit()
-    conn.close()
-    return jsonify({'success': True, 'message': f'{amount}포인트를 전송했습니다.'})
+    try:
+        with get_db() as conn:
+            ledger_id = transfers.transfer(conn, sender_id, recipient_id, amount)
+    except transfers.TransferError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status
+    invalidate_cached('user', sender_id, recipient_id)
+    return jsonify({'success': True, 'message': f'{amount}포인트를 전송했습니다.', 'ledger_id': ledger_id})
+
+@app.route('/transfer/batch', methods=['POST'])
+def transfer_points_batch():
+    payload = verify_token(request)
+    if not payload:
+        return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
+    data = request.get_json()
+    try:
+        batch = [(int(t['recipient_id']), int(t['amount'])) for t in data.get('transfers', [])]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'error': '올바른 수신자와 금액을 입력해주세요.'}), 400
+    try:
+        with get_db() as conn:
+            ledger_ids = transfers.transfer_batch(conn, payload['user_id'], batch)
+    except transfers.TransferError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status
+    invalidate_cached('user', payload['user_id'], *{recipient for recipient, _ in batch})
+    total = sum(amount for _, amount in batch)
+    return jsonify({'success': True, 'message': f'{len(batch)}건, {total}포인트를 전송했습니다.', 'ledger_ids': ledger_ids})
+
+# Socket.IO 도 REST 와 같은 토큰 검사: 연결 시 auth={'token': ...} (또는 ?token=) 로 인증
+@socketio.on('connect')
+def handle_connect(auth_data=None):
+    if rate_limiter.check('ip', ratelimit.client_ip(request)):
+        return False
+    token = (auth_data or {}).get('token') or request.args.get('token')
+    claims = token_auth.decode(token) if token else None
+    if not claims:
+        return False
+    socket_users[request.sid] = claims['user_id']
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    socket_users.pop(request.sid, None)
+
+def socket_auth_required(fn):
+    # 연결 후 정지된 사용자와 다른 사용자 행세(sender_id 위조)를 막는다
+    @functools.wraps(fn)
+    def wrapper(data):
+        user_id = socket_users.get(request.sid)
+        if user_id is None or token_auth.is_suspended(user_id):
+            emit('error', {'msg': '인증되지 않았습니다.'})
+            disconnect()
+            return
+        if data.get('sender_id') != user_id:
+            emit('error', {'msg': '본인 계정으로만 채팅할 수 있습니다.'})
+            return
+        return fn(data)
+    return wrapper
+
+def is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def chat_peer(sender, data):
+    # 상대 id 가 올바르지 않거나 자기 자신이면 오류 이벤트를 보내고 None
+    receiver = data.get('receiver_id')
+    if not is_positive_int(receiver) or receiver == sender:
+        emit('error', {'msg': '잘못된 상대입니다.'})
+        return None
+    return receiver
 
 @socketio.on('join')
+@instrumented('join')
+@socket_auth_required
 def handle_join(data):
-    sender = data['sender_id']
-    receiver = data['receiver_id']
+    # 방은 인증된 사용자와 상대로만 정해지므로 남의 대화방에는 들어갈 수 없다
+    sender = socket_users[request.sid]
+    receiver = chat_peer(sender, data)
+    if receiver is None:
+        return
     room = get_chat_room(sender, receiver)
     join_room(room)
     emit('status', {'msg': f'{sender}님이 입장했습니다.'}, room=room)
+    # 입장한 사용자에게만 최근 메시지 전달 (대부분 메모리 버퍼에서 처리)
+    messages, next_cursor = recent_messages.history(room, sender, receiver, limit=HISTORY_DEFAULT_LIMIT)
+    emit('history', {'messages': messages, 'next_cursor': next_cursor})
+
+@socketio.on('history')
+@instrumented('history')
+@socket_auth_required
+def handle_history(data):
+    sender = socket_users[request.sid]
+    receiver = chat_peer(sender, data)
+    if receiver is None:
+        return
+    before = data.get('before')
+    limit = data.get('limit', HISTORY_DEFAULT_LIMIT)
+    if (before is not None and not is_positive_int(before)) or not is_positive_int(limit):
+        emit('error', {'msg': '잘못된 페이지 값입니다.'})
+        return
+    limit = min(limit, recent_messages.per_room)
+    room = get_chat_room(sender, receiver)
+    messages, next_cursor = recent_messages.history(room, sender, receiver, before=before, limit=limit)
+    emit('history', {'messages': messages, 'next_cursor': next_cursor})
 
 @socketio.on('message')
+@instrumented('message')
+@socket_auth_required
 def handle_message(data):
     sender = data['sender_id']
-    receiver = data['receiver_id']
-    msg = data['message']
+    receiver = chat_peer(sender, data)
+    if receiver is None:
+        return
+    msg = data.get('message')
+    # 저장할 수 없는 값이 작성기 묶음에 섞이지 않도록 대기열에 넣기 전에 거절한다
+    if not isinstance(msg, str) or not msg.strip() or len(msg) > CHAT_MAX_MESSAGE_LENGTH:
+        emit('error', {'msg': f'메시지는 1~{CHAT_MAX_MESSAGE_LENGTH}자의 문자열이어야 합니다.'})
+        return
+    retry_after = rate_limiter.check('message', sender)
+    if retry_after:
+        emit('error', {'msg': '메시지를 너무 빨리 보내고 있습니다.', 'retry_after': retry_after})
+        return
     room = get_chat_room(sender, receiver)
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('INSERT INTO messages (sender_id, receiver_id, message) VALUES (?, ?, ?)', (sender, receiver, msg))
-    conn.commit()
-    conn.close()
+    entry = message_writer.submit(sender, receiver, msg)
+    if entry is None:
+        ratelimit.throttled.inc('message_queue', 'overloaded')
+        emit('error', {'msg': '메시지가 너무 많습니다. 잠시 후 다시 시도해주세요.'})
+        return
+    recent_messages.append(room, entry)
     emit('message', {'sender_id': sender, 'message': msg}, room=room)
 
 def get_chat_room(user1, user2):
     return f"room_{min(user1, user2)}_{max(user1, user2)}"
 
+@app.route('/chat/<int:other_id>/history', methods=['GET'])
+def get_chat_history(other_id):
+    payload = verify_token(request)
+    if not payload:
+        return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = parse_limit(HISTORY_DEFAULT_LIMIT, recent_messages.per_room)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 페이지 값입니다.'}), 400
+    user_id = payload['user_id']
+    if other_id == user_id:
+        return jsonify({'success': False, 'error': '자기 자신과의 대화는 없습니다.'}), 400
+    room = get_chat_room(user_id, other_id)
+    messages, next_cursor = recent_messages.history(room, user_id, other_id, before=before, limit=limit)
+    return jsonify({'success': True, 'messages': messages, 'next_cursor': next_cursor})
+
 @app.route('/me', methods=['GET'])
 def get_current_user():
     payload = verify_token(request)
     if not payload:
         return jsonify({'success': False, 'error': '인증되지 않았습니다.'}), 401
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT id, email, is_admin, is_suspended, points FROM users WHERE id = ?', (payload['user_id'],))
-    user = cur.fetchone()
-    conn.close()
-    if not user:
-        return jsonify({'success': False, 'error': '유저 정보를 찾을 수 없습니다.'}), 404
-    return jsonify({'success': True, 'user': dict(user)})
+    user_cache = read_caches['user']
+    user = user_cache.get(payload['user_id'])
+    if user is None:
+        generation = user_cache.generation()
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT id, email, is_admin, is_suspended, points FROM users WHERE id = ?', (payload['user_id'],))
+            row = cur.fetchone()
+        if not row:
+            return jsonify({'success': False, 'error': '유저 정보를 찾을 수 없습니다.'}), 404
+        user = dict(row)
+        user_cache.put(payload['user_id'], user, generation)
+    return jsonify({'success': True, 'user': user})
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True)
\ No newline at end of file
+    port = int(os.environ.get('TINYSHOP_PORT', '5000'))
+    debug = os.environ.get('TINYSHOP_DEBUG', '1') == '1'
+    socketio.run(app, port=port, debug=debug, use_reloader=debug, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+import metrics
+
+# 검증된 토큰 클레임 캐시 크기 (토큰 다이제스트 -> 클레임, 만료 시각까지 보관)
+TOKEN_CACHE_SIZE = int(os.environ.get('TINYSHOP_TOKEN_CACHE_SIZE', '10000'))
+JWT_ALGORITHMS = ['HS256']
+
+
+class TokenAuth:
+    def __init__(self, secret, cache_size=TOKEN_CACHE_SIZE):
+        self.secret = secret
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._suspended = set()
+        self._lock = threading.Lock()
+
+    def decode(self, token):
+        # 서명/만료 검증은 처음 한 번만. 이후에는 캐시된 클레임과 정지 목록만 확인한다
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                claims = entry[1]
+                return None if claims.get('user_id') in self._suspended else claims
+            if entry is not None:
+                del self._cache[key]
+            self.misses += 1
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=JWT_ALGORITHMS)
+        except jwt.PyJWTError:
+            return None
+        exp = claims.get('exp')
+        if exp is not None:
+            with self._lock:
+                self._cache[key] = (exp, claims)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return None if claims.get('user_id') in self._suspended else claims
+
+    def load_suspended(self, conn):
+        rows = conn.execute('SELECT id FROM users WHERE is_suspended = 1').fetchall()
+        with self._lock:
+            self._suspended = {row[0] for row in rows}
+
+    def suspend(self, user_id):
+        with self._lock:
+            self._suspended.add(user_id)
+
+    def is_suspended(self, user_id):
+        return user_id in self._suspended
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses,
+                    'suspended': len(self._suspended)}
+
+
+def bearer_token(request):
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return auth_header.split(' ')[1]
+
+
+def register_metrics(auth):
+    metrics.Counter('tinyshop_token_cache_hits_total', '검증된 토큰 캐시 적중 수', fn=lambda: auth.stats()['hits'])
+    metrics.Counter('tinyshop_token_cache_misses_total', '토큰 서명 검증 수 (캐시 미스)', fn=lambda: auth.stats()['misses'])
+    metrics.Gauge('tinyshop_suspended_users', '메모리 정지 목록의 사용자 수', fn=lambda: auth.stats()['suspended'])
+
+
+if __name__ == '__main__':
+    # 요청당 인증 비용 비교: python auth.py
+    import datetime
+    secret = 'benchmark-secret-key-of-at-least-32-bytes'
+    tokens = [jwt.encode({'user_id': i, 'is_admin': 0,
+                          'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=2)}, secret, algorithm='HS256')
+              for i in range(1000)]
+    rounds = 100000
+    start = time.perf_counter()
+    for i in range(rounds):
+        jwt.decode(tokens[i % len(tokens)], secret, algorithms=JWT_ALGORITHMS)
+    uncached = (time.perf_counter() - start) / rounds
+    auth = TokenAuth(secret)
+    start = time.perf_counter()
+    for i in range(rounds):
+        auth.decode(tokens[i % len(tokens)])
+    cached = (time.perf_counter() - start) / rounds
+    print(f'jwt.decode: {uncached * 1e6:.1f} us/req, TokenAuth.decode: {cached * 1e6:.1f} us/req '
+          f'(hits {auth.hits}, misses {auth.misses})')
@@ -0,0 +1,171 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# UI 서버가 API 서버를 호출할 때 쓰는 공용 클라이언트 (keep-alive 연결 풀 + 타임아웃 + 재시도 + 지연 통계)
+BACKEND_POOL_SIZE = int(os.environ.get('TINYSHOP_BACKEND_POOL_SIZE', '32'))
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get('TINYSHOP_BACKEND_CONNECT_TIMEOUT', '2'))
+BACKEND_READ_TIMEOUT = float(os.environ.get('TINYSHOP_BACKEND_READ_TIMEOUT', '10'))
+BACKEND_RETRIES = int(os.environ.get('TINYSHOP_BACKEND_RETRIES', '2'))
+FAN_OUT_WORKERS = int(os.environ.get('TINYSHOP_BACKEND_FAN_OUT', '8'))
+# ETag 로 재검증하는 응답/렌더링 결과 캐시 크기
+UI_CACHE_SIZE = int(os.environ.get('TINYSHOP_UI_CACHE_SIZE', '1024'))
+
+# 재시도는 멱등 요청에만 (POST 는 중복 처리될 수 있으므로 제외)
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+# 원래 브라우저 주소. API 서버가 IP 단위 요청 제한에 쓰도록 X-Forwarded-For 로 넘긴다
+client_ip = contextvars.ContextVar('client_ip', default=None)
+
+
+def endpoint_name(method, path):
+    # /items/12 -> GET /items/<id> 처럼 묶어서 집계
+    return method + ' ' + re.sub(r'/\d+', '/<id>', path.split('?')[0])
+
+
+class LRUCache:
+    def __init__(self, size=UI_CACHE_SIZE):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.bytes_saved = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed, error, status, size):
+        self.count += 1
+        self.errors += error
+        self.not_modified += status == 304
+        self.bytes += size
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'not_modified': self.not_modified,
+            'bytes': self.bytes,
+            'bytes_saved': self.bytes_saved,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0,
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+
+class BackendClient:
+    def __init__(self, base_url, pool_size=BACKEND_POOL_SIZE, retries=BACKEND_RETRIES,
+                 timeout=(BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT)):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=0.1,
+                      status_forcelist=(502, 503, 504), allowed_methods=IDEMPOTENT_METHODS,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._fan_out = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix='backend')
+        self.cache = LRUCache()
+
+    def request(self, method, path, token=None, headers=None, **kwargs):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        ip = client_ip.get()
+        if ip:
+            headers.setdefault('X-Forwarded-For', ip)
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        res = None
+        try:
+            res = self.session.request(method, self.base_url + path, headers=headers, **kwargs)
+            return res
+        finally:
+            status = res.status_code if res is not None else 0
+            if res is None:
+                size = 0
+            elif kwargs.get('stream'):
+                # 스트리밍 응답은 본문을 미리 읽지 않는다
+                size = int(res.headers.get('Content-Length') or 0)
+            else:
+                size = len(res.content)
+            with self._stats_lock:
+                self._stat(endpoint_name(method, path)).add(time.perf_counter() - start,
+                                                           res is None or status >= 500, status, size)
+
+    def get(self, path, token=None, **kwargs):
+        return self.request('GET', path, token, **kwargs)
+
+    def post(self, path, token=None, **kwargs):
+        return self.request('POST', path, token, **kwargs)
+
+    def put(self, path, token=None, **kwargs):
+        return self.request('PUT', path, token, **kwargs)
+
+    def delete(self, path, token=None, **kwargs):
+        return self.request('DELETE', path, token, **kwargs)
+
+    def get_cached(self, path, token=None, params=None):
+        # 이전 응답의 ETag 로 조건부 요청. 304 면 캐시된 본문을 그대로 쓴다. (데이터, ETag) 반환
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self.cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else None
+        res = self.get(path, token, params=params, headers=headers)
+        if res.status_code == 304 and cached:
+            with self._stats_lock:
+                self._stat(endpoint_name('GET', path)).bytes_saved += cached[2]
+            return cached[1], cached[0]
+        data = res.json()
+        etag = res.headers.get('ETag')
+        if etag and res.ok:
+            self.cache.put(key, (etag, data, len(res.content)))
+        return data, etag
+
+    def fan_out(self, *calls):
+        # calls: (method, path, kwargs) 튜플들을 동시에 보내고 같은 순서로 응답을 돌려준다
+        # 작업 스레드에도 client_ip 가 보이도록 호출마다 컨텍스트를 복사
+        futures = [self._fan_out.submit(contextvars.copy_context().run, self.request, method, path, **kwargs)
+                   for method, path, kwargs in calls]
+        return [f.result() for f in futures]
+
+    def _stat(self, name):
+        # _stats_lock 안에서 호출
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = EndpointStats()
+        return stats
+
+    def stats(self):
+        with self._stats_lock:
+            return {name: s.as_dict() for name, s in self._stats.items()}
@@ -0,0 +1,376 @@
+import argparse
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+import requests
+import socketio
+
+from seed_data import SEED_EMAIL, SEED_PASSWORD, TITLE_WORDS
+
+# app.py 부하 테스트 (seed_data.py 로 데이터를 넣은 서버 대상)
+#   python benchmark.py --duration 30 --rest-clients 16 --socket-clients 8 --save baseline.json
+#   python benchmark.py --compare baseline.json     # 기준보다 느려졌으면 종료 코드 1
+#   python benchmark.py --rest-clients 0 --socket-clients 16 --login-rate 200   # 로그인 폭주 중 채팅 지연
+# REST 요청과 Socket.IO join/message 를 동시에 보내고 작업별 p50/p95/p99 지연과 처리량을 출력한다.
+#
+# 부하 클라이언트는 모두 한 IP 에서 오므로 기본 속도 제한(ratelimit.DEFAULT_RATE_LIMITS)에 바로 걸린다.
+# 서버는 속도 제한을 끄고 띄운다:
+#   TINYSHOP_RATE_LIMITS=ip=0,login=0,transfer=0,message=0 python app.py
+# 제한을 켠 채로 재면 429 는 지연/오류가 아니라 별도 열(429)로 세고, Retry-After 만큼 쉬었다가 이어간다.
+BENCHMARK_RATE_LIMITS = 'ip=0,login=0,transfer=0,message=0'
+
+# 작업 -> 가중치 (REST 클라이언트가 매 요청마다 가중치에 따라 고른다)
+REST_MIX = {
+    'GET /items': 30,
+    'GET /items/search': 15,
+    'GET /items/<id>': 25,
+    'GET /me': 10,
+    'GET /chat/<id>/history': 10,
+    'POST /transfer': 10,
+}
+DEFAULT_TOLERANCE = 0.2
+# 클라이언트마다 한 번만 하는 작업 (처리량 비교에서 제외)
+SETUP_OPS = frozenset(['socket join'])
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def check_status(res, *ok_codes):
+    if res.status_code == 429:
+        raise RateLimited(float(res.headers.get('Retry-After', 1)))
+    return res.status_code in ok_codes
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.limited = {}
+        self._lock = threading.Lock()
+
+    def add(self, op, elapsed, ok):
+        with self._lock:
+            self.latencies.setdefault(op, []).append(elapsed)
+            if not ok:
+                self.errors[op] = self.errors.get(op, 0) + 1
+
+    def add_limited(self, op):
+        # 429 는 지연 분포에 넣지 않는다 (거절 응답의 지연은 작업 성능이 아님)
+        with self._lock:
+            self.latencies.setdefault(op, [])
+            self.limited[op] = self.limited.get(op, 0) + 1
+
+    def summary(self, duration):
+        with self._lock:
+            results = {}
+            for op, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                results[op] = {
+                    'count': len(values),
+                    'errors': self.errors.get(op, 0),
+                    'limited': self.limited.get(op, 0),
+                    'rps': round(len(values) / duration, 1),
+                    'p50_ms': percentile(values, 50),
+                    'p95_ms': percentile(values, 95),
+                    'p99_ms': percentile(values, 99),
+                }
+            return results
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def timed(recorder, op, fn, stop):
+    start = time.perf_counter()
+    try:
+        ok = fn()
+    except RateLimited as e:
+        recorder.add_limited(op)
+        stop.wait(e.retry_after)
+        return
+    except Exception:
+        ok = False
+    recorder.add(op, time.perf_counter() - start, ok)
+
+
+def login(session, url, user_id, recorder=None, timeout=10):
+    # 429 면 Retry-After 만큼 기다렸다가 timeout 까지 다시 시도한다
+    deadline = time.monotonic() + timeout
+    while True:
+        res = session.post(url + '/login', json={'email': SEED_EMAIL.format(user_id), 'password': SEED_PASSWORD})
+        if res.status_code != 429 or time.monotonic() >= deadline:
+            break
+        if recorder is not None:
+            recorder.add_limited('login')
+        time.sleep(float(res.headers.get('Retry-After', 1)))
+    data = res.json()
+    if not data.get('success'):
+        raise RuntimeError(f'로그인 실패 (user {user_id}): {data.get("error")}')
+    return data['token']
+
+
+def rest_client(args, recorder, stop, ready, max_item_id, rng):
+    session = requests.Session()
+    try:
+        token = login(session, args.url, rng.randint(*args.users), recorder, args.timeout)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        token = None
+    finally:
+        # 로그인(bcrypt)은 측정 구간에서 빼기 위해 모든 클라이언트가 준비될 때까지 기다린다
+        ready.wait()
+    if token is None:
+        return
+    headers = {'Authorization': f'Bearer {token}'}
+    ops = list(REST_MIX)
+    weights = [REST_MIX[op] for op in ops]
+    while not stop.is_set():
+        op = rng.choices(ops, weights)[0]
+        if op == 'GET /items':
+            call = lambda: check_status(session.get(args.url + '/items',
+                                                    params={'sort': rng.choice(['newest', 'price_asc'])}), 200)
+        elif op == 'GET /items/search':
+            call = lambda: check_status(session.get(args.url + '/items/search', params={'q': rng.choice(TITLE_WORDS)}), 200)
+        elif op == 'GET /items/<id>':
+            call = lambda: check_status(session.get(f'{args.url}/items/{rng.randint(1, max_item_id)}'), 200, 404)
+        elif op == 'GET /me':
+            call = lambda: check_status(session.get(args.url + '/me', headers=headers), 200)
+        elif op == 'GET /chat/<id>/history':
+            call = lambda: check_status(session.get(f'{args.url}/chat/{rng.randint(*args.users)}/history',
+                                                    headers=headers), 200)
+        else:
+            # 잔액 부족(403)도 정상 응답으로 본다
+            call = lambda: check_status(session.post(args.url + '/transfer', headers=headers,
+                                                     json={'recipient_id': rng.randint(*args.users), 'amount': 1}),
+                                        200, 403)
+        timed(recorder, op, call, stop)
+
+
+def socket_client(args, recorder, stop, ready, rng):
+    sender = rng.randint(*args.users)
+    receiver = rng.randint(*args.users)
+    try:
+        token = login(requests.Session(), args.url, sender, recorder, args.timeout)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        token = None
+    client = socketio.Client(reconnection=False)
+    history = threading.Event()
+    pending = {}
+    limited = []
+
+    @client.on('history')
+    def on_history(data):
+        history.set()
+
+    @client.on('message')
+    def on_message(data):
+        event = pending.get(data.get('message'))
+        if event is not None:
+            event.set()
+
+    @client.on('error')
+    def on_error(data):
+        # 메시지 속도 제한: 한 번에 하나만 보내므로 기다리는 메시지가 거절된 것
+        if 'retry_after' in data:
+            limited.append(data['retry_after'])
+            for event in list(pending.values()):
+                event.set()
+
+    start = time.perf_counter()
+    try:
+        client.connect(args.url, auth={'token': token})
+        client.emit('join', {'sender_id': sender, 'receiver_id': receiver})
+        ok = history.wait(args.timeout)
+    except Exception:
+        ok = False
+    recorder.add('socket join', time.perf_counter() - start, ok)
+    ready.wait()
+    if not ok:
+        client.disconnect()
+        return
+    while not stop.is_set():
+        # 보낸 메시지가 같은 방으로 다시 브로드캐스트될 때까지의 왕복 시간
+        text = uuid.uuid4().hex
+        event = pending[text] = threading.Event()
+        start = time.perf_counter()
+        client.emit('message', {'sender_id': sender, 'receiver_id': receiver, 'message': text})
+        ok = event.wait(args.timeout)
+        del pending[text]
+        if limited:
+            recorder.add_limited('socket message')
+            stop.wait(limited.pop())
+            continue
+        recorder.add('socket message', time.perf_counter() - start, ok)
+        if args.message_interval:
+            stop.wait(args.message_interval)
+    client.disconnect()
+
+
+def login_burst(args, recorder, stop, ready, rng):
+    # 초당 login_rate 번 로그인을 예약하고 작업 스레드가 꺼내 보낸다 (개방형 부하).
+    # 지연은 예약 시각부터 재므로 서버가 밀려 대기열이 쌓인 시간도 들어간다
+    schedule = queue.Queue()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            scheduled = schedule.get()
+            if scheduled is None:
+                return
+            user_id = rng.randint(*args.users)
+            try:
+                res = session.post(args.url + '/login', timeout=args.timeout,
+                                   json={'email': SEED_EMAIL.format(user_id), 'password': SEED_PASSWORD})
+                ok = check_status(res, 200) and res.json().get('success')
+            except RateLimited:
+                recorder.add_limited('login burst')
+                continue
+            except Exception:
+                ok = False
+            recorder.add('login burst', time.perf_counter() - scheduled, ok)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(args.login_workers)]
+    for thread in workers:
+        thread.start()
+    ready.wait()
+    interval = 1 / args.login_rate
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        schedule.put(next_at)
+        next_at += interval
+        stop.wait(max(0.0, next_at - time.perf_counter()))
+    # 남은 예약은 버리고 작업 스레드를 끝낸다
+    while not schedule.empty():
+        schedule.get_nowait()
+    for _ in workers:
+        schedule.put(None)
+    deadline = time.monotonic() + args.timeout
+    for thread in workers:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+
+def run(args):
+    max_item_id = requests.get(args.url + '/items', params={'limit': 1, 'fields': 'id'}).json()['items'][0]['id']
+    recorder = Recorder()
+    stop = threading.Event()
+    ready = threading.Barrier(args.rest_clients + args.socket_clients + bool(args.login_rate) + 1)
+    threads = [threading.Thread(target=rest_client, args=(args, recorder, stop, ready, max_item_id, random.Random(args.seed + i)))
+               for i in range(args.rest_clients)]
+    threads += [threading.Thread(target=socket_client, args=(args, recorder, stop, ready, random.Random(-args.seed - i)))
+                for i in range(args.socket_clients)]
+    if args.login_rate:
+        threads.append(threading.Thread(target=login_burst, args=(args, recorder, stop, ready, random.Random(args.seed))))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    stop.wait(args.duration)
+    stop.set()
+    # 처리량은 측정 구간 길이로 나눈다 (끝나지 않은 요청을 기다린 시간은 빼고)
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join(args.timeout)
+    return recorder.summary(elapsed)
+
+
+def print_results(results):
+    print(f"{'작업':<24}{'요청':>8}{'오류':>6}{'429':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for op, r in results.items():
+        print(f"{op:<24}{r['count']:>8}{r['errors']:>6}{r['limited']:>6}{r['rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    total = sum(r['rps'] for r in results.values())
+    print(f'전체 처리량: {total:.1f} req/s (지연 단위 ms)')
+    limited = sum(r['limited'] for r in results.values())
+    if limited:
+        print(f'⚠️  속도 제한(429) {limited}건: 서버를 TINYSHOP_RATE_LIMITS={BENCHMARK_RATE_LIMITS} 로 띄웠는지 확인')
+
+
+def print_login_burst(results, login_rate):
+    logins = results.get('login burst', {'rps': 0})
+    chat = results.get('socket message')
+    print(f"로그인 폭주: 목표 {login_rate:g}/s, 실제 {logins['rps']}/s")
+    if chat:
+        print(f"  채팅 왕복 지연: p50 {chat['p50_ms']} ms / p99 {chat['p99_ms']} ms")
+
+
+def compare(results, baseline, tolerance):
+    # p95 가 기준보다 tolerance 이상 늘었거나 처리량이 그만큼 줄었으면 회귀
+    regressions = []
+    for op, base in baseline['results'].items():
+        current = results.get(op)
+        if current is None:
+            regressions.append(f'{op}: 측정되지 않음')
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{op}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if op not in SETUP_OPS and current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{op}: 처리량 {base['rps']} -> {current['rps']} req/s")
+        if current['errors'] > base['errors'] and current['errors'] > current['count'] * 0.01:
+            regressions.append(f"{op}: 오류 {base['errors']} -> {current['errors']}")
+        if current['limited'] > base.get('limited', 0):
+            regressions.append(f"{op}: 429 {base.get('limited', 0)} -> {current['limited']} (속도 제한 설정이 다름)")
+    return regressions
+
+
+def parse_range(raw):
+    low, _, high = raw.partition('-')
+    return int(low), int(high or low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TinyShop 부하 테스트')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--rest-clients', type=int, default=16)
+    parser.add_argument('--socket-clients', type=int, default=8)
+    parser.add_argument('--users', type=parse_range, default=(2, 1000),
+                        help='로그인/대화에 쓸 시드 사용자 id 범위 (예: 2-100000)')
+    parser.add_argument('--message-interval', type=float, default=0, help='소켓 클라이언트의 메시지 간격(초)')
+    parser.add_argument('--login-rate', type=float, default=0, help='측정 중 함께 보낼 초당 로그인 수 (예: 200)')
+    parser.add_argument('--login-workers', type=int, default=64, help='로그인 폭주를 보내는 동시 연결 수')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help='결과를 기준선(JSON)으로 저장')
+    parser.add_argument('--compare', help='기준선(JSON)과 비교해 회귀가 있으면 종료 코드 1')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+    if args.login_rate:
+        print_login_burst(results, args.login_rate)
+    if args.save:
+        meta = {k: v for k, v in vars(args).items() if k not in ('save', 'compare')}
+        meta['created_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f'✅ 기준선 저장: {args.save}')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('❌ 성능 회귀:')
+            for line in regressions:
+                print('  - ' + line)
+            sys.exit(1)
+        print(f'✅ 기준선 대비 회귀 없음 (허용 {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
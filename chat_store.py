@@ -0,0 +1,398 @@
+import datetime
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+import retention
+from db import connect, get_db
+
+logger = logging.getLogger(__name__)
+
+# 한 트랜잭션에 묶을 최대 메시지 수 / 최대 대기 시간(ms) / 대기열 크기
+CHAT_BATCH_SIZE = int(os.environ.get('TINYSHOP_CHAT_BATCH_SIZE', '256'))
+CHAT_FLUSH_MS = int(os.environ.get('TINYSHOP_CHAT_FLUSH_MS', '20'))
+CHAT_MAX_QUEUE = int(os.environ.get('TINYSHOP_CHAT_MAX_QUEUE', '10000'))
+CHAT_ENQUEUE_TIMEOUT = float(os.environ.get('TINYSHOP_CHAT_ENQUEUE_TIMEOUT', '0.5'))
+# 메시지 한 건의 최대 길이 (문자 수)
+CHAT_MAX_MESSAGE_LENGTH = int(os.environ.get('TINYSHOP_CHAT_MAX_MESSAGE_LENGTH', '2000'))
+# 기록 실패 시 재시도 간격(ms, 지수 증가 상한) / 종료 중에 포기하기 전 재시도 횟수
+CHAT_RETRY_BACKOFF_MS = float(os.environ.get('TINYSHOP_CHAT_RETRY_BACKOFF_MS', '50'))
+CHAT_RETRY_MAX_MS = float(os.environ.get('TINYSHOP_CHAT_RETRY_MAX_MS', '2000'))
+CHAT_STOP_RETRIES = int(os.environ.get('TINYSHOP_CHAT_STOP_RETRIES', '5'))
+# relaxed: fsync 없음 / normal: WAL 체크포인트 때만 fsync / full: 커밋마다 fsync
+CHAT_DURABILITY = os.environ.get('TINYSHOP_CHAT_DURABILITY', 'normal')
+DURABILITY_SYNCHRONOUS = {'relaxed': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+# 방마다 메모리에 보관할 최근 메시지 수 / 보관할 최대 방 수 / 전체 메모리 상한(바이트 추정치)
+CHAT_RECENT_PER_ROOM = int(os.environ.get('TINYSHOP_CHAT_RECENT_PER_ROOM', '100'))
+CHAT_CACHE_ROOMS = int(os.environ.get('TINYSHOP_CHAT_CACHE_ROOMS', '10000'))
+CHAT_CACHE_BYTES = int(os.environ.get('TINYSHOP_CHAT_CACHE_BYTES', str(64 * 1024 * 1024)))
+ENTRY_OVERHEAD_BYTES = 200
+
+INSERT_MESSAGE = 'INSERT INTO messages (sender_id, receiver_id, message, timestamp) VALUES (?, ?, ?, ?)'
+
+_STOP = object()
+
+
+def now_timestamp():
+    # CURRENT_TIMESTAMP 와 같은 형식 (UTC)
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+# 채팅 메시지를 모아서 한 트랜잭션으로 기록하는 백그라운드 작성기
+class MessageWriter:
+    def __init__(self, path=None, batch_size=CHAT_BATCH_SIZE, flush_ms=CHAT_FLUSH_MS,
+                 max_queue=CHAT_MAX_QUEUE, durability=CHAT_DURABILITY, on_commit=None):
+        if durability not in DURABILITY_SYNCHRONOUS:
+            raise ValueError(f'unknown durability mode: {durability}')
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.durability = durability
+        # 묶음이 커밋된 뒤 (id 가 채워진 메시지 목록으로) 작성기 스레드에서 호출
+        self.on_commit = on_commit
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, sender_id, receiver_id, message, timestamp=None, timeout=CHAT_ENQUEUE_TIMEOUT):
+        # 메시지 항목(dict)을 돌려준다. id 는 커밋 후 채워진다.
+        # 대기열이 가득 차 timeout 안에 넣지 못하면 None (호출 측에서 거절)
+        entry = {
+            'id': None,
+            'sender_id': sender_id,
+            'receiver_id': receiver_id,
+            'message': message,
+            'timestamp': timestamp or now_timestamp(),
+        }
+        try:
+            self._queue.put(entry, timeout=timeout)
+            return entry
+        except queue.Full:
+            return None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        # 지금까지 넣은 메시지가 모두 커밋될 때까지 대기
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=10):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _insert(self, conn, batch):
+        with conn:
+            cur = conn.cursor()
+            ids = []
+            for entry in batch:
+                cur.execute(INSERT_MESSAGE, (entry['sender_id'], entry['receiver_id'], entry['message'], entry['timestamp']))
+                ids.append(cur.lastrowid)
+        return ids
+
+    def _run(self):
+        conn = connect(self.path)
+        conn.execute(f'PRAGMA synchronous = {DURABILITY_SYNCHRONOUS[self.durability]}')
+        running = True
+        while running:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _write(self, conn, batch):
+        # 이미 상대에게 전달된 메시지이므로 잠금 대기 같은 일시적 오류는 커밋될 때까지 같은 묶음을 재시도한다.
+        # 그동안 대기열이 차면 submit 이 None 을 돌려 새 메시지는 전송 전에 거절된다
+        attempt = 0
+        while True:
+            try:
+                ids = self._insert(conn, batch)
+                break
+            except sqlite3.OperationalError:
+                attempt += 1
+                if self._stopping and attempt > CHAT_STOP_RETRIES:
+                    self.failed += len(batch)
+                    logger.exception('giving up on %d chat messages at shutdown', len(batch))
+                    return
+                self.retries += 1
+                delay = min(CHAT_RETRY_BACKOFF_MS * 2 ** (attempt - 1), CHAT_RETRY_MAX_MS) / 1000
+                logger.warning('failed to persist %d chat messages (attempt %d), retrying in %.2fs',
+                               len(batch), attempt, delay, exc_info=True)
+                time.sleep(delay)
+            except sqlite3.Error:
+                # 제약 위반/바인딩 오류는 재시도해도 같으므로, 한 건씩 다시 써서 문제 있는 메시지만 버린다
+                if len(batch) > 1:
+                    for entry in batch:
+                        self._write(conn, [entry])
+                    return
+                self.failed += 1
+                logger.exception('dropping chat message %r that cannot be stored', batch[0])
+                return
+        # 커밋이 끝난 뒤에만 id 를 노출 (롤백된 id 가 커서로 쓰이지 않도록)
+        for entry, message_id in zip(batch, ids):
+            entry['id'] = message_id
+        self.written += len(batch)
+        if self.on_commit is not None:
+            try:
+                self.on_commit(batch)
+            except Exception:
+                logger.exception('chat commit callback failed')
+
+
+HISTORY_COLUMNS = 'id, sender_id, receiver_id, message, timestamp'
+MAX_MESSAGE_ID = 2 ** 63 - 1
+
+
+ONE_WAY_HISTORY_SQL = f'''SELECT {HISTORY_COLUMNS} FROM messages
+                          WHERE sender_id = ? AND receiver_id = ? AND id < ? ORDER BY id DESC LIMIT ?'''
+HISTORY_SQL = f'''SELECT * FROM ({ONE_WAY_HISTORY_SQL})
+                  UNION ALL
+                  SELECT * FROM ({ONE_WAY_HISTORY_SQL})
+                  ORDER BY id DESC LIMIT ?'''
+
+
+def load_history(conn, user1, user2, before=None, limit=50):
+    # 두 방향을 각각 (sender_id, receiver_id, id) 인덱스로 역순 범위 조회한 뒤 합친다.
+    # 같은 사용자끼리면 두 방향이 같은 행이므로 한 번만 읽는다.
+    # 보관 기간이 지나 아카이브로 옮겨진 메시지도 이어서 읽는다
+    before = before if before is not None else MAX_MESSAGE_ID
+    if user1 == user2:
+        cur = conn.execute(ONE_WAY_HISTORY_SQL, (user1, user2, before, limit))
+    else:
+        cur = conn.execute(HISTORY_SQL, (user1, user2, before, limit, user2, user1, before, limit, limit))
+    rows = [dict(row) for row in reversed(cur.fetchall())]
+    return retention.merge_archived(conn, user1, user2, before, limit, rows)
+
+
+def entry_size(entry):
+    return len(entry['message'].encode('utf-8')) + ENTRY_OVERHEAD_BYTES
+
+
+class RoomBuffer:
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.seeded = False
+        # DB 에 entries[0] 보다 오래된 메시지가 더 있을 수 있는지
+        self.has_older = True
+        self.bytes = 0
+
+
+# 방별 최근 메시지 링 버퍼. 방 단위 LRU 로 방 수와 전체 메모리를 제한한다
+class RecentMessages:
+    def __init__(self, per_room=CHAT_RECENT_PER_ROOM, max_rooms=CHAT_CACHE_ROOMS, max_bytes=CHAT_CACHE_BYTES,
+                 writer=None):
+        self.per_room = per_room
+        self.writer = writer
+        self.max_rooms = max_rooms
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, room, entry):
+        with self._lock:
+            buf = self._rooms.get(room)
+            if buf is None:
+                # 처음 보는 방은 미시드 상태로 만들고, 이력 조회 시 DB 내용과 합친다
+                buf = self._rooms[room] = RoomBuffer(self.per_room)
+            else:
+                self._rooms.move_to_end(room)
+            if len(buf.entries) == buf.entries.maxlen:
+                evicted = buf.entries[0]
+                buf.bytes -= entry_size(evicted)
+                self.bytes -= entry_size(evicted)
+                buf.has_older = True
+            buf.entries.append(entry)
+            buf.bytes += entry_size(entry)
+            self.bytes += entry_size(entry)
+            self._evict()
+
+    def discard(self, room):
+        with self._lock:
+            buf = self._rooms.pop(room, None)
+            if buf is not None:
+                self.bytes -= buf.bytes
+
+    def history(self, room, user1, user2, before=None, limit=50):
+        # (메시지 목록(오래된 것부터), 다음 페이지 커서) 반환
+        with self._lock:
+            buf = self._rooms.get(room)
+            page = None
+            if buf is not None:
+                self._rooms.move_to_end(room)
+                if buf.seeded:
+                    page = self._page(buf, before, limit)
+            if page is not None:
+                self.hits += 1
+                next_cursor = self._next_cursor(buf, page, limit)
+            else:
+                self.misses += 1
+        if page is None:
+            if before is None:
+                page, next_cursor = self._seed(room, user1, user2, limit)
+            else:
+                with get_db() as conn:
+                    page = load_history(conn, user1, user2, before, limit)
+                next_cursor = page[0]['id'] if len(page) >= limit else None
+        if next_cursor is False:
+            next_cursor = self._committed_cursor(user1, user2)
+        return [dict(e) for e in page], next_cursor
+
+    def _next_cursor(self, buf, page, limit):
+        # self._lock 안에서 호출. 페이지 전체가 아직 커밋 전이면 기록을 기다리지 않고
+        # 페이지 바로 앞의 커밋된 메시지 id + 1 을 커서로 쓴다 (그 메시지부터 이어서 읽힌다).
+        # 버퍼에 그런 메시지가 없으면 False 를 돌려 DB 에서 찾게 한다
+        if not page or len(page) < limit:
+            return None
+        if page[0]['id'] is not None:
+            return page[0]['id']
+        older = list(buf.entries)[:len(buf.entries) - len(page)]
+        for entry in reversed(older):
+            if entry['id'] is not None:
+                return entry['id'] + 1
+        return False if buf.has_older else None
+
+    def _committed_cursor(self, user1, user2):
+        # 방 버퍼가 전부 미커밋 메시지로 찬 드문 경우: 지금까지 커밋된 가장 최근 메시지부터 이어서 읽는다
+        with get_db() as conn:
+            rows = load_history(conn, user1, user2, None, 1)
+        return rows[-1]['id'] + 1 if rows else None
+
+    def _page(self, buf, before, limit):
+        if before is None:
+            candidates = list(buf.entries)
+        else:
+            candidates = [e for e in buf.entries if e['id'] is not None and e['id'] < before]
+        if len(candidates) >= limit:
+            start = len(candidates) - limit
+            if candidates[start]['id'] is None:
+                # 커밋 전 메시지는 id 가 없어 커서로 이어 읽을 수 없으므로 페이지에 모두 담는다
+                while start > 0 and candidates[start - 1]['id'] is None:
+                    start -= 1
+            return candidates[start:]
+        if not buf.has_older:
+            return candidates
+        return None
+
+    def _seed(self, room, user1, user2, limit):
+        with get_db() as conn:
+            rows = load_history(conn, user1, user2, None, self.per_room)
+        with self._lock:
+            buf = self._rooms.get(room)
+            if buf is None:
+                buf = self._rooms[room] = RoomBuffer(self.per_room)
+            if not buf.seeded:
+                # 버퍼에 이미 쌓인 메시지 중 DB 에 아직 없는 것만 뒤에 붙인다
+                known = {row['id'] for row in rows}
+                pending = [e for e in buf.entries if e['id'] is None or e['id'] not in known]
+                self.bytes -= buf.bytes
+                buf.entries.clear()
+                for entry in rows + pending:
+                    buf.entries.append(entry)
+                buf.bytes = sum(entry_size(e) for e in buf.entries)
+                self.bytes += buf.bytes
+                buf.has_older = len(rows) + len(pending) >= self.per_room
+                buf.seeded = True
+            page = self._page(buf, None, limit) or []
+            next_cursor = self._next_cursor(buf, page, limit)
+            self._evict()
+        return page, next_cursor
+
+    def _evict(self):
+        while self._rooms and (len(self._rooms) > self.max_rooms or self.bytes > self.max_bytes):
+            _, buf = self._rooms.popitem(last=False)
+            self.bytes -= buf.bytes
+
+
+def benchmark(path, rooms=1000, senders=32, messages=20000):
+    # 방 1,000개에 메시지를 보낼 때 초당 처리량: 메시지마다 커밋 vs MessageWriter 묶음 커밋
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    per_sender = messages // senders
+    pairs = [(r * 2 + 1, r * 2 + 2) for r in range(rooms)]
+
+    def per_message(seed):
+        rng = random.Random(seed)
+        conn = connect(path)
+        for i in range(per_sender):
+            sender, receiver = rng.choice(pairs)
+            with conn:
+                conn.execute(INSERT_MESSAGE, (sender, receiver, f'msg {i}', now_timestamp()))
+        conn.close()
+
+    writer = MessageWriter(path)
+
+    def batched(seed):
+        rng = random.Random(seed)
+        for i in range(per_sender):
+            sender, receiver = rng.choice(pairs)
+            while writer.submit(sender, receiver, f'msg {i}') is None:
+                pass
+
+    results = {}
+    for name, fn in (('commit per message', per_message), ('MessageWriter', batched)):
+        if fn is batched:
+            writer.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=senders) as executor:
+            list(executor.map(fn, range(senders)))
+        if fn is batched:
+            writer.flush()
+        elapsed = time.perf_counter() - start
+        results[name] = per_sender * senders / elapsed
+        print(f'{name:20} {per_sender * senders:,} msgs in {elapsed:.2f}s -> {results[name]:,.0f} msgs/s')
+    writer.stop()
+    return results
+
+
+if __name__ == '__main__':
+    # python chat_store.py [DB 경로] (기본: 임시 DB. 실제 DB 에 쓰지 않도록 주의)
+    import sys
+    import tempfile
+    from migrations import migrate
+    # 메시지마다 커밋하는 쪽은 잠금 대기가 길어 느린 쿼리 로그가 쏟아지므로 끈다
+    logging.getLogger('db').setLevel(logging.ERROR)
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.mkdtemp(), 'chat_bench.db')
+    setup = connect(target)
+    migrate(setup)
+    setup.close()
+    benchmark(target)
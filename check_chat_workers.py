@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+import socketio
+
+# 워커 2개를 같은 DB/메시지 큐로 띄워, 워커 A 에서 보낸 채팅이 워커 B 에 실시간으로 전달되고
+# 이력 조회에도 나오는지 확인
+#   python check_chat_workers.py
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_PORT = int(os.environ.get('TINYSHOP_CHECK_PORT', '5710'))
+WAIT_SECONDS = 10
+PASSWORD = 'check-password'
+
+
+def start_workers(workdir, ports):
+    env = dict(os.environ)
+    env['TINYSHOP_DB_PATH'] = os.path.join(workdir, 'tinyshop.db')
+    env['TINYSHOP_SOCKETIO_QUEUE'] = 'sqlite:///tinyshop_pubsub.db'
+    env['TINYSHOP_DEBUG'] = '0'
+    procs = []
+    for port in ports:
+        procs.append(subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'app.py')],
+                                      env=dict(env, TINYSHOP_PORT=str(port)),
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        # 첫 워커가 마이그레이션을 끝낸 뒤 다음 워커를 띄운다
+        wait_ready(port)
+    return procs
+
+
+def wait_ready(port):
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/items', timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError(f'worker on port {port} did not start')
+
+
+def login(base_url, email):
+    requests.post(f'{base_url}/register', json={'email': email, 'password': PASSWORD}, timeout=5)
+    resp = requests.post(f'{base_url}/login', json={'email': email, 'password': PASSWORD}, timeout=5)
+    resp.raise_for_status()
+    token = resp.json()['token']
+    me = requests.get(f'{base_url}/me', headers={'Authorization': f'Bearer {token}'}, timeout=5).json()
+    return token, me['user']['id']
+
+
+def connect(base_url, token, histories, received):
+    client = socketio.Client()
+    client.on('history', lambda data: histories.append([m['message'] for m in data['messages']]))
+    client.on('message', lambda data: received.append(data['message']))
+    client.connect(base_url, auth={'token': token}, transports=['polling'])
+    return client
+
+
+def wait_for(predicate):
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def check(url_a, url_b):
+    token_a, user_a = login(url_a, 'worker-a@example.com')
+    token_b, user_b = login(url_a, 'worker-b@example.com')
+    history_a, history_b = [], []
+    received_b = []
+    client_a = connect(url_a, token_a, history_a, [])
+    client_b = connect(url_b, token_b, history_b, received_b)
+    try:
+        # 두 워커 모두 방 버퍼를 먼저 채워 둔다
+        client_a.emit('join', {'sender_id': user_a, 'receiver_id': user_b})
+        client_b.emit('join', {'sender_id': user_b, 'receiver_id': user_a})
+        if not wait_for(lambda: history_a and history_b):
+            return ['join did not return history']
+        text = f'hello from worker A {time.time()}'
+        client_a.emit('message', {'sender_id': user_a, 'receiver_id': user_b, 'message': text})
+        failures = []
+        # 같은 방에 있는 워커 B 의 클라이언트가 이벤트를 직접 받아야 한다
+        if not wait_for(lambda: text in received_b):
+            failures.append(f'message sent on {url_a} was not delivered live to the client on {url_b}')
+
+        def seen_on_b():
+            client_b.emit('history', {'sender_id': user_b, 'receiver_id': user_a})
+            time.sleep(0.1)
+            return text in history_b[-1]
+        if not wait_for(seen_on_b):
+            failures.append(f'message sent on {url_a} missing from history on {url_b}')
+        return failures
+    finally:
+        client_a.disconnect()
+        client_b.disconnect()
+
+
+if __name__ == '__main__':
+    ports = [BASE_PORT, BASE_PORT + 1]
+    with tempfile.TemporaryDirectory() as workdir:
+        procs = start_workers(workdir, ports)
+        try:
+            failures = check(*(f'http://127.0.0.1:{port}' for port in ports))
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait()
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print('✅ 다른 워커에서 보낸 메시지가 실시간으로 전달되고 이력에 나타남')
@@ -0,0 +1,140 @@
+import ast
+import itertools
+import os
+import sys
+
+import chat_store
+import listing
+import moderation
+import retention
+from db import connect
+from migrations import migrate
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# SQL 을 실행하는 모듈 (execute('<문자열 상수>') 호출을 찾는다)
+SOURCE_FILES = ('app.py', 'auth.py', 'transfers.py', 'moderation.py', 'chat_store.py', 'retention.py')
+# 모듈 수준 *_SQL 상수로 SQL 을 두는 모듈
+CONSTANT_MODULES = (chat_store, retention)
+
+# 의도적으로 전체 테이블을 읽는 쿼리 (몇 행뿐인 집계 카운터, 관리 명령의 보고용 집계 등)
+ALLOWED_FULL_SCANS = {
+    'SELECT name, value FROM dashboard_counters',
+    'SELECT COUNT(*) FROM messages',
+}
+
+
+def find_queries(path):
+    # execute('<문자열 상수>', ...) 호출에서 SQL 을 뽑아낸다
+    tree = ast.parse(open(path, encoding='utf-8').read())
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            yield node.lineno, ' '.join(node.args[0].value.split())
+
+
+def constant_queries(module):
+    for name, value in sorted(vars(module).items()):
+        if name.endswith('_SQL') and isinstance(value, str):
+            yield name, ' '.join(value.split())
+
+
+def full_scans(conn, sql, params=None):
+    params = params if params is not None else (None,) * sql.count('?')
+    plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    # SCAN (subquery-N) 은 인덱스로 이미 잘라낸 서브쿼리 결과를 읽는 것이라 제외
+    return [row[3] for row in plan
+            if row[3].startswith('SCAN ') and not row[3].startswith('SCAN (subquery')
+            and 'VIRTUAL TABLE' not in row[3] and 'INDEX' not in row[3]]
+
+
+def temp_sorts(conn, sql, params):
+    plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    return [row[3] for row in plan if 'TEMP B-TREE' in row[3]]
+
+
+# 관리자 사용자 목록 필터 값 (빈 값은 필터 없음)
+ADMIN_USER_FILTER_VALUES = {
+    'suspended': ('', '1'),
+    'admin': ('', '0'),
+    'email_prefix': ('', 'user'),
+    'min_points': ('', '100'),
+    'max_points': ('', '900'),
+}
+
+
+def admin_user_queries():
+    # 필터 조합마다 첫 페이지와 커서 다음 페이지 SQL. (위치, SQL, 파라미터, 필터 없이 id 순으로 읽는지)
+    names = list(ADMIN_USER_FILTER_VALUES)
+    for values in itertools.product(*ADMIN_USER_FILTER_VALUES.values()):
+        args = dict(zip(names, values))
+        clauses, params = listing.build_admin_users_filter(args)
+        keys = listing.admin_users_sort(args)
+        label = 'listing.py admin users ' + (','.join(n for n in names if args[n]) or 'all')
+        yield label, listing.build_admin_users_query(clauses, keys) + ' LIMIT ?', params + [51], not clauses
+        cursor = listing.parse_admin_users_cursor(keys, ':'.join('1' for _ in keys))
+        yield (label + ' +cursor',
+               listing.build_admin_users_query(clauses + [f"({', '.join(keys)}) > ({', '.join('?' for _ in keys)})"], keys)
+               + ' LIMIT ?', params + cursor + [51], False)
+
+
+def item_queries():
+    # 정렬 방식마다 첫 페이지와 커서 다음 페이지, 그리고 검색
+    for sort, (keys, _) in listing.ITEM_SORTS.items():
+        sql, params = listing.build_items_query(sort, listing.ITEM_FIELDS, None)
+        yield f'listing.py items sort={sort}', sql + ' LIMIT ?', params + [21], keys == ('id',)
+        sql, params = listing.build_items_query(sort, listing.ITEM_FIELDS, [100] * len(keys))
+        yield f'listing.py items sort={sort} +cursor', sql + ' LIMIT ?', params + [21], False
+    # bm25 순위 정렬은 FTS 가 돌려준 일치 항목만 정렬한다
+    yield 'listing.py search', listing.build_search_query(listing.ITEM_FIELDS), ('"중고"*', 10.0, 1.0, 21, 0), False
+
+
+def moderation_queries():
+    for target_type, (column, _) in moderation.TARGETS.items():
+        yield (f'moderation.py reporter check ({target_type})',
+               f'SELECT 1 FROM reports WHERE {column} = ? AND reporter_id = ? AND id != ? LIMIT 1', (1, 1, 1), False)
+    for action, sql in moderation.ACTIONS.items():
+        yield f'moderation.py {action}', sql, (1,), False
+
+
+# 이 위치의 임시 정렬은 의도된 것 (전체가 아니라 검색 결과만 정렬)
+ALLOWED_TEMP_SORTS = {'listing.py search'}
+
+
+def check_builders(conn):
+    # 요청 값에 따라 조립되는 SQL 은 조합마다 만들어 본다. 정렬도 인덱스 순서로 처리돼야 한다
+    failures = []
+    queries = itertools.chain(item_queries(), admin_user_queries(), moderation_queries())
+    for location, sql, params, first_page_by_id in queries:
+        # 필터 없는 첫 페이지는 rowid 순으로 LIMIT 만큼만 읽으므로 SCAN 이어도 된다
+        details = [] if first_page_by_id else full_scans(conn, sql, params)
+        sorts = [] if location in ALLOWED_TEMP_SORTS else temp_sorts(conn, sql, params)
+        for detail in details + sorts:
+            failures.append((location, sql, detail))
+    return failures
+
+
+def check(conn):
+    queries = [(f'{name}:{lineno}', sql) for name in SOURCE_FILES
+               for lineno, sql in find_queries(os.path.join(BASE_DIR, name))]
+    queries += [(f'{module.__name__}.{name}', sql) for module in CONSTANT_MODULES
+                for name, sql in constant_queries(module)]
+    failures = []
+    for location, sql in queries:
+        if sql in ALLOWED_FULL_SCANS or sql.upper().startswith(('INSERT', 'PRAGMA', 'BEGIN')):
+            continue
+        for detail in full_scans(conn, sql):
+            failures.append((location, sql, detail))
+    return failures
+
+
+if __name__ == '__main__':
+    conn = connect(':memory:')
+    migrate(conn)
+    failures = check(conn) + check_builders(conn)
+    for location, sql, detail in failures:
+        print(f'{location}: {detail}\n    {sql}')
+    conn.close()
+    if failures:
+        sys.exit(1)
+    print('✅ 전체 테이블 스캔/임시 정렬 쿼리 없음')
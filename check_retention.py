@@ -0,0 +1,72 @@
+import sys
+import tempfile
+
+import retention
+from db import connect
+from migrations import migrate
+
+# 아카이브 파일/목록을 기록한 뒤 삭제 전에 멈춘 상황을 만들고, 다시 실행해 이어서 끝나는지 확인
+#   python check_retention.py
+MESSAGES = 300
+PAIRS = ((1, 2), (2, 3), (1, 3))
+OLD_TIMESTAMP = '2020-01-15 12:00:00'
+CUTOFF = '2021-01-01 00:00:00'
+
+
+class Crash(Exception):
+    pass
+
+
+def seed(conn):
+    with conn:
+        conn.executemany('INSERT INTO messages (sender_id, receiver_id, message, timestamp) VALUES (?, ?, ?, ?)',
+                         [(*PAIRS[i % len(PAIRS)], f'message {i}', OLD_TIMESTAMP) for i in range(MESSAGES)])
+
+
+def crash_before_delete(conn, ids, **kwargs):
+    raise Crash()
+
+
+def check(conn, archive_dir):
+    failures = []
+    delete_messages = retention.delete_messages
+    retention.delete_messages = crash_before_delete
+    try:
+        retention.archive_messages(conn, CUTOFF, archive_dir=archive_dir)
+        failures.append('simulated crash did not happen')
+    except Crash:
+        pass
+    finally:
+        retention.delete_messages = delete_messages
+    try:
+        moved, files = retention.archive_messages(conn, CUTOFF, archive_dir=archive_dir)
+    except Exception as e:
+        return failures + [f're-run after crash failed: {e!r}']
+    if moved != MESSAGES:
+        failures.append(f're-run moved {moved} messages, expected {MESSAGES}')
+    left = conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+    if left:
+        failures.append(f'{left} messages left in the DB')
+    archives = conn.execute('SELECT COUNT(*) FROM message_archives').fetchone()[0]
+    if archives != len(set(files)):
+        failures.append(f'{archives} catalog rows for {len(set(files))} archive files')
+    found = 0
+    for user1, user2 in PAIRS:
+        found += len(retention.merge_archived(conn, user1, user2, 2 ** 63 - 1, MESSAGES, [], archive_dir))
+    if found != MESSAGES:
+        failures.append(f'{found} archived messages readable, expected {MESSAGES}')
+    return failures
+
+
+if __name__ == '__main__':
+    conn = connect(':memory:')
+    migrate(conn)
+    seed(conn)
+    with tempfile.TemporaryDirectory() as archive_dir:
+        failures = check(conn, archive_dir)
+    conn.close()
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print('✅ 삭제 전에 멈춘 아카이브 작업을 다시 실행해 끝냄')
@@ -0,0 +1,103 @@
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import db
+import transfers
+from db import connect
+from migrations import migrate
+
+# 여러 스레드가 각자 연결로 동시에 송금(단건/일괄)을 보낸 뒤, 포인트 총합이 그대로이고
+# 음수 잔액이 없으며 사용자별 잔액이 원장과 맞는지 확인
+#   python check_transfers.py [동시 송금 스레드 수]
+USERS = 20
+INITIAL_POINTS = 1000
+SENDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+TRANSFERS_PER_SENDER = 50
+# 잔액보다 큰 금액도 섞어 잔액 부족 거절이 함께 일어나게 한다
+MAX_AMOUNT = 300
+
+
+def seed(conn):
+    with conn:
+        conn.executemany('INSERT INTO users (email, password_hash, points) VALUES (?, ?, ?)',
+                         [(f'transfer{i}@example.com', '-', INITIAL_POINTS) for i in range(USERS)])
+    return [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+
+
+def sender(path, user_ids, seed_value, outcomes, start):
+    rng = random.Random(seed_value)
+    conn = connect(path)
+    start.wait()
+    try:
+        for _ in range(TRANSFERS_PER_SENDER):
+            sender_id = rng.choice(user_ids)
+            try:
+                if rng.random() < 0.2:
+                    batch = [(rng.choice(user_ids), rng.randint(1, MAX_AMOUNT // 3)) for _ in range(rng.randint(2, 5))]
+                    transfers.transfer_batch(conn, sender_id, batch)
+                else:
+                    transfers.transfer(conn, sender_id, rng.choice(user_ids), rng.randint(1, MAX_AMOUNT))
+                result = 'ok'
+            except transfers.InsufficientPoints:
+                result = 'insufficient'
+            except sqlite3.OperationalError as e:
+                # 재시도를 다 쓴 잠금 경합 (롤백됐으므로 불변식에는 영향 없음)
+                result = 'busy' if transfers.is_busy(e) else f'error: {e}'
+            outcomes.append(result)
+    finally:
+        conn.close()
+
+
+def check(conn, user_ids, outcomes):
+    failures = [f'transfer failed: {o}' for o in set(outcomes) if o.startswith('error')]
+    total = conn.execute('SELECT SUM(points) FROM users').fetchone()[0]
+    if total != USERS * INITIAL_POINTS:
+        failures.append(f'SUM(points) is {total}, expected {USERS * INITIAL_POINTS}')
+    negative = conn.execute('SELECT id, points FROM users WHERE points < 0').fetchall()
+    for row in negative:
+        failures.append(f'user {row["id"]} has negative balance {row["points"]}')
+    # 잔액 = 초기값 - 보낸 합 + 받은 합 (원장에 없는 변경이나 원장만 남은 송금이 없어야 한다)
+    for user_id in user_ids:
+        sent = conn.execute('SELECT COALESCE(SUM(amount), 0) FROM point_ledger WHERE sender_id = ?', (user_id,)).fetchone()[0]
+        received = conn.execute('SELECT COALESCE(SUM(amount), 0) FROM point_ledger WHERE recipient_id = ?',
+                                (user_id,)).fetchone()[0]
+        points = conn.execute('SELECT points FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+        if points != INITIAL_POINTS - sent + received:
+            failures.append(f'user {user_id}: balance {points} != {INITIAL_POINTS} - {sent} + {received} from ledger')
+    return failures
+
+
+if __name__ == '__main__':
+    # 잠금 대기가 의도된 부하라 BEGIN IMMEDIATE 느린 쿼리 경고는 끈다
+    db.logger.setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'tinyshop.db')
+        conn = connect(path)
+        migrate(conn)
+        user_ids = seed(conn)
+        outcomes = []
+        start = threading.Barrier(SENDERS + 1)
+        threads = [threading.Thread(target=sender, args=(path, user_ids, i, outcomes, start)) for i in range(SENDERS)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        failures = check(conn, user_ids, outcomes)
+        conn.close()
+    counts = {o: outcomes.count(o) for o in sorted(set(outcomes))}
+    print(f'{SENDERS} senders, {len(outcomes)} transfers in {elapsed:.1f}s '
+          f'({len(outcomes) / elapsed:.0f}/s): {counts}')
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print('✅ 동시 송금 후 포인트 총합 유지, 음수 잔액 없음, 잔액이 원장과 일치')
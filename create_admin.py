@@ -1,8 +1,7 @@
-import os
 import sqlite3
 import bcrypt
-
-DB_PATH = os.path.join(os.path.dirname(__file__), 'tinyshop.db')
+from db import DB_PATH
+from passwords import BCRYPT_ROUNDS
 
 conn = sqlite3.connect(DB_PATH)
 cur = conn.cursor()
@@ -12,7 +11,7 @@ INSERT INTO users (email, password_hash, is_admin)
 VALUES (?, ?, 1)
 ''', (
     'admin@example.com',
-    bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS)).decode('utf-8')
 ))
 
 conn.commit()
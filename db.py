@@ -0,0 +1,288 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+try:
+    # eventlet/gevent 에서는 그린렛마다, 일반 스레드에서는 스레드마다 (스레드별 메인 그린렛) 다른 값
+    from greenlet import getcurrent as current_task
+except ImportError:  # greenlet 이 없으면 스레드 단위
+    current_task = threading.current_thread
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get('TINYSHOP_DB_PATH', os.path.join(os.path.dirname(__file__), 'tinyshop.db'))
+
+# 풀 크기 / 대기 시간 (환경변수로 조정 가능)
+POOL_SIZE = int(os.environ.get('TINYSHOP_DB_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.environ.get('TINYSHOP_DB_POOL_TIMEOUT', '10'))
+STATEMENT_CACHE_SIZE = 256
+# 이 시간(ms)보다 오래 걸린 SQL 은 실행 계획과 함께 경고 로그로 남긴다 (0 이면 끔)
+SLOW_QUERY_MS = float(os.environ.get('TINYSHOP_SLOW_QUERY_MS', '100'))
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+# 연결마다 적용하는 튜닝 PRAGMA
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -20000),       # 약 20MB 페이지 캐시
+    ('mmap_size', 268435456),     # 256MB
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+)
+
+
+_statement_kinds = {}
+
+
+def statement_kind(sql):
+    # 메트릭 라벨용 첫 키워드 (SELECT, UPDATE, BEGIN ...). SQL 문자열은 대부분 상수라 캐시한다
+    kind = _statement_kinds.get(sql)
+    if kind is None:
+        head = sql.lstrip()[:10].split(None, 1)
+        kind = head[0].upper() if head else ''
+        if len(_statement_kinds) < STATEMENT_CACHE_SIZE * 4:
+            _statement_kinds[sql] = kind
+    return kind
+
+
+def explain(conn, sql, params):
+    if statement_kind(sql) not in EXPLAINABLE:
+        return ''
+    if params is None:
+        params = (None,) * sql.count('?')
+    try:
+        rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return f'  (plan unavailable: {e})'
+    return '\n'.join(f'  {row[3]}' for row in rows)
+
+
+def record_statement(conn, sql, params, elapsed):
+    kind = statement_kind(sql)
+    metrics.db_latency.observe(elapsed, kind)
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        metrics.db_slow.inc(kind)
+        plan = explain(conn, sql, params)
+        logger.warning('slow query (%.1f ms): %s%s', elapsed * 1000, ' '.join(sql.split()), '\n' + plan if plan else '')
+
+
+# 모든 SQL 문의 실행 시간을 재는 커서/연결 (conn.execute 와 cursor().execute 둘 다)
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            record_statement(self.connection, sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            record_statement(self.connection, sql, None, time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            record_statement(self, 'COMMIT', None, time.perf_counter() - start)
+
+
+def sqlite_url_path(url):
+    # sqlite:///name.db 는 DB_PATH 와 같은 디렉터리 기준, sqlite:////abs/name.db 는 절대 경로
+    return os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), url[len('sqlite:///'):])
+
+
+def connect(path=None):
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=TimedConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, path=None, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        # 실행 단위(그린렛/스레드) -> 사용 중인 연결. threading.local 은 monkey_patch 없이는
+        # 그린렛끼리 공유되므로 현재 그린렛을 키로 쓴다
+        self._owners = {}
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return connect(self.path)
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError('DB 연결 풀이 모두 사용 중입니다.')
+
+    def _release(self, conn):
+        # 커밋되지 않은 트랜잭션은 롤백한 뒤 풀로 돌려보낸다
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        # 같은 그린렛(스레드) 안에서 중첩 호출하면 같은 연결을 재사용
+        task = current_task()
+        conn = self._owners.get(task)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._acquire()
+        self._owners[task] = conn
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            del self._owners[task]
+            self._release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._created -= 1
+
+
+pool = ConnectionPool()
+
+
+def get_db():
+    return pool.connection()
+
+
+@contextmanager
+def dedicated_connection(path=None):
+    # 응답 스트리밍처럼 yield 사이에 연결을 오래 쥐고 있는 읽기 작업용. 풀 자리를 차지하지 않고
+    # 다른 요청과 공유되지 않는 별도 연결을 쓰고 닫는다 (WAL 이라 쓰기를 막지 않음)
+    conn = connect(path or pool.path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+
+class PerRequestConnections:
+    # 풀 도입 전 방식 (벤치마크 비교용): 요청마다 기본 설정(롤백 저널) 연결을 열고 닫는다
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+def benchmark(items=500, requests_per_client=300, clients=4):
+    # 요청마다 새 연결(예전 get_db_connection) vs 풀: python db.py [시드 상품 수]
+    # Flask 테스트 클라이언트로 GET /items, POST /items 처리량을 같은 프로세스 안에서 잰다
+    import shutil
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    workdir = tempfile.mkdtemp()
+    os.environ.update({'TINYSHOP_DB_PATH': os.path.join(workdir, 'tinyshop.db'), 'TINYSHOP_BCRYPT_ROUNDS': '4',
+                       'TINYSHOP_RATE_LIMITS': 'ip=0,item_write=0', 'TINYSHOP_SLOW_QUERY_MS': '0'})
+    # python db.py 로 실행하면 이 모듈은 __main__ 이므로 app 이 쓰는 db 모듈을 따로 가져와 풀을 바꿔 끼운다
+    import app as tinyshop
+    import db as app_db
+    from migrations import migrate
+
+    def prepare(name, journal_mode):
+        path = os.path.join(workdir, name)
+        conn = connect(path)
+        migrate(conn)
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+        with conn:
+            conn.executemany('INSERT INTO items (title, description, price, seller_id) VALUES (?, ?, ?, 1)',
+                             [(f'상품 {i}', f'설명 {i}', 1000 + i) for i in range(items)])
+        conn.close()
+        return path
+
+    def measure(call):
+        def run_client(_):
+            client = tinyshop.app.test_client()
+            return sum(call(client).status_code == 200 for _ in range(requests_per_client))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            ok = sum(executor.map(run_client, range(clients)))
+        return requests_per_client * clients, ok, time.perf_counter() - start
+
+    modes = (('per-request connection', PerRequestConnections(prepare('before.db', 'DELETE'))),
+             ('pool', ConnectionPool(prepare('after.db', 'WAL'))))
+    account = {'email': 'bench@example.com', 'password': 'bench-password'}
+    item = {'title': '벤치마크 상품', 'description': '설명', 'price': 1000}
+    try:
+        for label, source in modes:
+            app_db.pool = source
+            client = tinyshop.app.test_client()
+            client.post('/register', json=account)
+            headers = {'Authorization': f"Bearer {client.post('/login', json=account).get_json()['token']}"}
+            print(label)
+            for op, call in (('GET /items', lambda c: c.get('/items')),
+                             ('POST /items', lambda c: c.post('/items', headers=headers, json=item))):
+                total, ok, elapsed = measure(call)
+                print(f'  {op:12} {total / elapsed:8.1f} req/s  ({total - ok} errors)')
+            source.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+import time
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson 이 없으면 표준 json 으로 인코딩
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 가 없으면 gzip 만 협상
+    brotli = None
+
+# JSON 인코더: auto(orjson 이 있으면 사용) / stdlib
+JSON_ENCODER = os.environ.get('TINYSHOP_JSON_ENCODER', 'auto')
+# Socket.IO 직렬화: default(JSON) / msgpack (msgpack 패키지와 클라이언트 socket.io-msgpack-parser 필요)
+SOCKETIO_SERIALIZER = os.environ.get('TINYSHOP_SOCKETIO_SERIALIZER', 'default')
+# 이보다 작은 응답은 압축하지 않는다 (헤더/CPU 비용이 절약분보다 큼)
+COMPRESS_MIN_BYTES = int(os.environ.get('TINYSHOP_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('TINYSHOP_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('TINYSHOP_BROTLI_QUALITY', '4'))
+COMPRESSIBLE_MIMETYPES = frozenset(['application/json', 'text/html', 'text/csv', 'text/plain',
+                                    'text/css', 'application/javascript', 'image/svg+xml'])
+# 스트리밍 응답은 이만큼 모일 때마다 내보낸다
+STREAM_FLUSH_BYTES = 16 * 1024
+
+
+def use_orjson():
+    return orjson is not None and JSON_ENCODER != 'stdlib'
+
+
+if use_orjson():
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, **kwargs):
+        # 표준 json.dumps 와 같은 str 반환 (separators/ensure_ascii 등은 무시: 항상 간결한 UTF-8)
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS).decode('utf-8')
+
+    loads = orjson.loads
+else:
+    def dumps(obj, **kwargs):
+        kwargs.setdefault('default', DefaultJSONProvider.default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    loads = json.loads
+
+
+def timed_dumps(target):
+    def encode(obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return dumps(obj, **kwargs)
+        finally:
+            metrics.json_encode_latency.observe(time.perf_counter() - start, target)
+    return encode
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # jsonify/응답 본문용. 키 정렬/들여쓰기 없이 한 번에 UTF-8 로 인코딩
+    _dumps = staticmethod(timed_dumps('http'))
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+
+class SocketIOJSON:
+    # python-socketio 의 json 모듈 자리에 들어가는 dumps/loads
+    dumps = staticmethod(timed_dumps('socketio'))
+    loads = staticmethod(loads)
+
+
+def configure(app):
+    app.json = FastJSONProvider(app)
+
+
+def socketio_options():
+    options = {'json': SocketIOJSON}
+    if SOCKETIO_SERIALIZER != 'default':
+        options['serializer'] = SOCKETIO_SERIALIZER
+    return options
+
+
+def accepted_encodings(header):
+    # Accept-Encoding 의 q 값을 반영해 허용되는 인코딩 집합을 돌려준다
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def negotiate(header):
+    accepted = accepted_encodings(header or '')
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    # 스트리밍 응답을 조각 단위로 압축하되, 너무 잘게 쪼개지지 않도록 모아서 flush
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        out = process(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            out += flush()
+            pending = 0
+        if out:
+            yield out
+    yield finish()
+
+
+def compress_response(response, request, min_bytes=COMPRESS_MIN_BYTES):
+    # after_request 에서 호출. 이미 인코딩됐거나 본문이 없는 응답은 그대로 둔다
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or request.method == 'HEAD'):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    elif response.direct_passthrough:
+        # send_file 등 파일 응답은 압축하지 않음
+        return response
+    else:
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # 압축 표현은 원본과 바이트가 다르므로 약한 ETag 로 바꾼다 (If-None-Match 는 약한 비교)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def benchmark(items=100000, page=100, rounds=20):
+    # 상품 목록 응답 크기/인코딩 CPU 시간 비교: python encoding.py [상품 수]
+    catalog = [{'id': i, 'title': f'중고 상품 {i} 판매합니다', 'description': f'상태 좋은 물건입니다. 직거래 가능 #{i % 97}',
+                'price': 1000 + (i * 37) % 500000, 'seller_id': 1 + i % 5000,
+                'image_url': f'/static/uploads/{i:064x}.jpg' if i % 3 else None} for i in range(items)]
+    encoders = [('json', lambda obj: json.dumps(obj, ensure_ascii=False, sort_keys=True).encode('utf-8'))]
+    if orjson is not None:
+        encoders.append(('orjson', lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)))
+    try:
+        import msgpack
+        encoders.append(('msgpack', msgpack.packb))
+    except ImportError:
+        pass
+    encodings = [None, 'gzip'] + (['br'] if brotli is not None else [])
+    for label, payload, n in ((f'page ({page} items)', {'success': True, 'items': catalog[:page], 'next_cursor': str(page)}, rounds * 50),
+                              (f'catalog ({items} items)', catalog, max(1, rounds // 10))):
+        print(label)
+        for name, encode in encoders:
+            start = time.process_time()
+            for _ in range(n):
+                body = encode(payload)
+            encode_ms = (time.process_time() - start) / n * 1000
+            for encoding in encodings:
+                start = time.process_time()
+                for _ in range(n):
+                    out = compress(body, encoding) if encoding else body
+                compress_ms = (time.process_time() - start) / n * 1000
+                print(f'  {name:8} {encoding or "identity":9} {len(out):>11,} B  encode {encode_ms:8.3f} ms'
+                      f'  compress {compress_ms:8.3f} ms')
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,124 @@
+# 목록 조회 SQL 을 요청 값에 따라 조립하는 함수들. app.py 가 쓰고,
+# check_query_plans.py 가 가능한 조합마다 실행 계획을 확인한다 (그래서 Flask 에 의존하지 않는다)
+
+# 상품 목록: 키셋(커서) 페이지네이션
+ITEM_FIELDS = ('id', 'title', 'description', 'price', 'seller_id', 'image_url')
+# sort -> (정렬 키 컬럼, 방향)
+ITEM_SORTS = {
+    'newest': (('id',), 'DESC'),
+    'oldest': (('id',), 'ASC'),
+    'price_asc': (('price', 'id'), 'ASC'),
+    'price_desc': (('price', 'id'), 'DESC'),
+}
+
+
+def parse_item_fields(raw):
+    if not raw:
+        return ITEM_FIELDS
+    fields = tuple(f.strip() for f in raw.split(',') if f.strip())
+    if not fields or any(f not in ITEM_FIELDS for f in fields):
+        return None
+    return fields
+
+
+def parse_item_cursor(sort, raw):
+    if not raw:
+        return None
+    keys, _ = ITEM_SORTS[sort]
+    parts = raw.split(':')
+    if len(parts) != len(keys):
+        return False
+    try:
+        return [int(p) for p in parts]
+    except ValueError:
+        return False
+
+
+def make_item_cursor(sort, row):
+    keys, _ = ITEM_SORTS[sort]
+    return ':'.join(str(row[k]) for k in keys)
+
+
+def build_items_query(sort, fields, cursor):
+    keys, direction = ITEM_SORTS[sort]
+    columns = list(fields) + [k for k in keys if k not in fields]
+    sql = f"SELECT {', '.join(columns)} FROM items"
+    params = []
+    if cursor is not None:
+        op = '<' if direction == 'DESC' else '>'
+        sql += f" WHERE ({', '.join(keys)}) {op} ({', '.join('?' for _ in keys)})"
+        params.extend(cursor)
+    sql += ' ORDER BY ' + ', '.join(f'{k} {direction}' for k in keys)
+    return sql, params
+
+
+def build_search_query(fields):
+    # FTS5 + bm25 랭킹. 파라미터: (검색어, 제목 가중치, 설명 가중치, LIMIT, OFFSET)
+    columns = ', '.join(f'items.{f}' for f in fields)
+    return f'''SELECT {columns} FROM items_fts JOIN items ON items.id = items_fts.rowid
+               WHERE items_fts MATCH ? ORDER BY bm25(items_fts, ?, ?) LIMIT ? OFFSET ?'''
+
+
+# 관리자 사용자 목록: 정렬 키는 필터가 쓰는 인덱스 순서를 따른다
+ADMIN_USER_FIELDS = ('id', 'email', 'is_admin', 'is_suspended', 'points')
+
+
+def prefix_upper_bound(prefix):
+    # 'abc' -> 'abd': email >= 'abc' AND email < 'abd' 로 UNIQUE(email) 인덱스를 범위 검색
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_admin_users_filter(args):
+    # (WHERE 조건 목록, 파라미터) 반환. 잘못된 값이면 ValueError
+    clauses, params = [], []
+    for name, column in (('suspended', 'is_suspended'), ('admin', 'is_admin')):
+        value = args.get(name)
+        if not value:
+            continue
+        if value not in ('0', '1'):
+            raise ValueError(name)
+        clauses.append(f'{column} = ?')
+        params.append(int(value))
+    prefix = args.get('email_prefix', '').strip()
+    if prefix:
+        clauses.append('email >= ? AND email < ?')
+        params.extend([prefix, prefix_upper_bound(prefix)])
+    for name, op in (('min_points', '>='), ('max_points', '<=')):
+        value = args.get(name)
+        if not value:
+            continue
+        clauses.append(f'points {op} ?')
+        params.append(int(value))
+    return clauses, params
+
+
+def admin_users_sort(args):
+    # 정렬 키를 검색에 쓰는 인덱스 순서와 맞춰야 일치하는 행 전체를 임시 B-tree 로 정렬하지 않고
+    # 한 페이지만 읽는다. 정지/관리자 필터는 (플래그, id) 인덱스, 이메일 접두어는 UNIQUE(email),
+    # 포인트 범위는 (points, id) 인덱스를 쓰고 나머지 조건은 읽으면서 거른다
+    if args.get('suspended') or args.get('admin'):
+        return ('id',)
+    if args.get('email_prefix', '').strip():
+        return ('email',)
+    if args.get('min_points') or args.get('max_points'):
+        return ('points', 'id')
+    return ('id',)
+
+
+def parse_admin_users_cursor(keys, raw):
+    # 커서는 정렬 키 값들을 ':' 로 이은 것 (이메일은 그대로). 잘못된 값이면 ValueError
+    if not raw:
+        return None
+    if keys == ('email',):
+        return [raw]
+    parts = raw.split(':')
+    if len(parts) != len(keys):
+        raise ValueError(raw)
+    return [int(p) for p in parts]
+
+
+def build_admin_users_query(clauses, keys):
+    sql = f"SELECT {', '.join(ADMIN_USER_FIELDS)} FROM users"
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    return sql + ' ORDER BY ' + ', '.join(keys)
@@ -0,0 +1,134 @@
+import bisect
+import hmac
+import os
+import threading
+
+# Prometheus 텍스트 형식(/metrics)으로 내보내는 최소한의 카운터/게이지/히스토그램.
+# 값은 프로세스마다 따로 모이므로 run_workers.py 로 여러 워커를 띄우면 워커별 포트를 각각 수집한다.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 설정하면 /metrics 는 Authorization: Bearer <토큰> 요청에만 응답. 비어 있으면 같은 호스트에서 온 요청만 허용
+METRICS_TOKEN = os.environ.get('TINYSHOP_METRICS_TOKEN', '')
+LOCAL_ADDRS = frozenset(['127.0.0.1', '::1'])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), fn=None):
+        # fn 이 있으면 수집 시점에 호출해 {라벨 튜플: 값} (라벨이 없으면 숫자) 을 얻는다
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def samples(self):
+        if self.fn is not None:
+            values = self.fn()
+            if not isinstance(values, dict):
+                values = {(): values}
+            return [(self.name, key, value) for key, value in sorted(values.items())]
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for name, key, value, *extra in self.samples():
+            lines.append(f'{name}{_labels(self.labels, key, extra)} {_number(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # 구간별 개수(누적 아님), 합계, 전체 개수
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                samples.append((self.name + '_bucket', key, cumulative, ('le', _number(bound))))
+            samples.append((self.name + '_sum', key, total))
+            samples.append((self.name + '_count', key, count))
+        return samples
+
+
+registry = []
+
+
+def render():
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+
+def scrape_allowed(request):
+    if METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                   f'Bearer {METRICS_TOKEN}'.encode('utf-8'))
+    # X-Forwarded-For 는 보지 않는다 (UI 서버를 거친 요청도 127.0.0.1 이지만 UI 는 /metrics 를 중계하지 않음)
+    return request.remote_addr in LOCAL_ADDRS
+
+
+http_requests = Counter('tinyshop_http_requests_total', 'HTTP 요청 수', ('method', 'route', 'status'))
+http_latency = Histogram('tinyshop_http_request_duration_seconds', 'HTTP 요청 처리 시간', ('method', 'route'))
+db_latency = Histogram('tinyshop_db_statement_duration_seconds', 'SQL 문 실행 시간', ('statement',))
+db_slow = Counter('tinyshop_db_slow_statements_total', '느린 쿼리 로그 임계값을 넘은 SQL 문 수', ('statement',))
+hash_latency = Histogram('tinyshop_password_hash_duration_seconds', 'bcrypt 해싱/검증 시간 (대기 포함)', ('op',),
+                         buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+socketio_events = Counter('tinyshop_socketio_events_total', 'Socket.IO 이벤트 수', ('event',))
+socketio_latency = Histogram('tinyshop_socketio_event_duration_seconds', 'Socket.IO 이벤트 처리 시간', ('event',))
+json_encode_latency = Histogram('tinyshop_json_encode_duration_seconds', 'JSON 인코딩 시간 (http: 응답 본문, socketio: 이벤트)',
+                                ('target',), buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                                                      0.025, 0.05, 0.1))
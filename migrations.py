@@ -0,0 +1,256 @@
+from db import connect
+
+# (버전, 이름, SQL 문 목록) - 순서대로 한 번씩만 적용된다.
+# 가능한 단계는 IF NOT EXISTS 를 사용해 기존 init_db.py 로 만든 DB 에도 안전하게 적용된다.
+MIGRATIONS = [
+    (1, 'base tables', (
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            intro_text TEXT DEFAULT '',
+            is_admin INTEGER DEFAULT 0,
+            is_suspended INTEGER DEFAULT 0,
+            points INTEGER DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            price INTEGER NOT NULL,
+            seller_id INTEGER NOT NULL,
+            image_url TEXT,
+            FOREIGN KEY (seller_id) REFERENCES users(id)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reporter_id INTEGER NOT NULL,
+            target_user_id INTEGER,
+            target_item_id INTEGER,
+            reason TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (reporter_id) REFERENCES users(id),
+            FOREIGN KEY (target_user_id) REFERENCES users(id),
+            FOREIGN KEY (target_item_id) REFERENCES items(id)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES users(id),
+            FOREIGN KEY (receiver_id) REFERENCES users(id)
+        )''',
+    )),
+    (2, 'items price index', (
+        'CREATE INDEX IF NOT EXISTS idx_items_price ON items (price, id)',
+    )),
+    # unicode61 + 접두어 인덱스: '아이폰*' 이 '아이폰을', '아이폰15' 등 조사/접미어가 붙은 어절과 매칭
+    (3, 'items full-text index', (
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            title,
+            description,
+            content='items',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF title, description ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO items_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END''',
+        "INSERT INTO items_fts (items_fts) VALUES ('rebuild')",
+    )),
+    # 신고 누적 COUNT, 판매자별 상품, 채팅 내역 조회용 커버링 인덱스
+    (4, 'hot query indexes', (
+        'CREATE INDEX IF NOT EXISTS idx_reports_target_user ON reports (target_user_id, reporter_id)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_target_item ON reports (target_item_id, reporter_id)',
+        'CREATE INDEX IF NOT EXISTS idx_items_seller ON items (seller_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages (sender_id, receiver_id, id)',
+    )),
+    # ETag 용 버전 카운터: 테이블 단위(table_versions)와 상품 행 단위(items.version)
+    (5, 'data version counters', (
+        '''CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )''',
+        "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('items', 0)",
+        'ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        '''CREATE TRIGGER IF NOT EXISTS items_version_ai AFTER INSERT ON items BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS items_version_ad AFTER DELETE ON items BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS items_version_au
+        AFTER UPDATE OF title, description, price, seller_id, image_url ON items BEGIN
+            UPDATE items SET version = old.version + 1 WHERE id = new.id;
+            UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+        END''',
+    )),
+    # 포인트 송금 원장 (추가만 가능)
+    (6, 'point ledger', (
+        '''CREATE TABLE IF NOT EXISTS point_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            recipient_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL CHECK (amount > 0),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES users(id),
+            FOREIGN KEY (recipient_id) REFERENCES users(id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_point_ledger_sender ON point_ledger (sender_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_point_ledger_recipient ON point_ledger (recipient_id, id)',
+        '''CREATE TRIGGER IF NOT EXISTS point_ledger_no_update BEFORE UPDATE ON point_ledger BEGIN
+            SELECT RAISE(ABORT, 'point_ledger is append-only');
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS point_ledger_no_delete BEFORE DELETE ON point_ledger BEGIN
+            SELECT RAISE(ABORT, 'point_ledger is append-only');
+        END''',
+    )),
+    # 신고 대상별 고유 신고자 수 (신고 때마다 COUNT(*) 하지 않도록) + 자동 조치 대기열
+    (7, 'report counters and moderation queue', (
+        '''CREATE TABLE IF NOT EXISTS report_counts (
+            target_type TEXT NOT NULL,
+            target_id INTEGER NOT NULL,
+            reporters INTEGER NOT NULL DEFAULT 0,
+            actioned INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (target_type, target_id)
+        ) WITHOUT ROWID''',
+        '''INSERT OR IGNORE INTO report_counts (target_type, target_id, reporters)
+            SELECT 'user', target_user_id, COUNT(DISTINCT reporter_id) FROM reports
+            WHERE target_user_id IS NOT NULL GROUP BY target_user_id''',
+        '''INSERT OR IGNORE INTO report_counts (target_type, target_id, reporters)
+            SELECT 'item', target_item_id, COUNT(DISTINCT reporter_id) FROM reports
+            WHERE target_item_id IS NOT NULL GROUP BY target_item_id''',
+        '''CREATE TABLE IF NOT EXISTS moderation_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            target_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed_at TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_moderation_pending ON moderation_queue (id) WHERE processed_at IS NULL',
+    )),
+    # 관리자 목록 필터용 인덱스 + 대시보드 집계 카운터(트리거로 증감)
+    (8, 'admin listing indexes and dashboard counters', (
+        'CREATE INDEX IF NOT EXISTS idx_users_suspended ON users (is_suspended, id)',
+        'CREATE INDEX IF NOT EXISTS idx_users_admin ON users (is_admin, id)',
+        'CREATE INDEX IF NOT EXISTS idx_users_points ON users (points, id)',
+        'CREATE INDEX IF NOT EXISTS idx_report_counts_top ON report_counts (target_type, reporters)',
+        '''CREATE TABLE IF NOT EXISTS dashboard_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''INSERT OR REPLACE INTO dashboard_counters (name, value) VALUES
+            ('users', (SELECT COUNT(*) FROM users)),
+            ('suspended_users', (SELECT COUNT(*) FROM users WHERE is_suspended = 1)),
+            ('items', (SELECT COUNT(*) FROM items)),
+            ('reports', (SELECT COUNT(*) FROM reports))''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_users_ai AFTER INSERT ON users BEGIN
+            UPDATE dashboard_counters SET value = value + 1 WHERE name = 'users';
+            UPDATE dashboard_counters SET value = value + 1 WHERE name = 'suspended_users' AND new.is_suspended = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_users_ad AFTER DELETE ON users BEGIN
+            UPDATE dashboard_counters SET value = value - 1 WHERE name = 'users';
+            UPDATE dashboard_counters SET value = value - 1 WHERE name = 'suspended_users' AND old.is_suspended = 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_users_au AFTER UPDATE OF is_suspended ON users
+        WHEN (new.is_suspended = 1) != (old.is_suspended = 1) BEGIN
+            UPDATE dashboard_counters SET value = value + (CASE WHEN new.is_suspended = 1 THEN 1 ELSE -1 END)
+            WHERE name = 'suspended_users';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_items_ai AFTER INSERT ON items BEGIN
+            UPDATE dashboard_counters SET value = value + 1 WHERE name = 'items';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_items_ad AFTER DELETE ON items BEGIN
+            UPDATE dashboard_counters SET value = value - 1 WHERE name = 'items';
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS dashboard_reports_ai AFTER INSERT ON reports BEGIN
+            UPDATE dashboard_counters SET value = value + 1 WHERE name = 'reports';
+        END''',
+    )),
+    # 채팅 보관 기간 정리: 오래된 메시지를 시간순으로 찾는 인덱스 + 아카이브 파일/대화 쌍별 위치 목록
+    (9, 'message archives', (
+        'CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp)',
+        '''CREATE TABLE IF NOT EXISTS message_archives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL,
+            period TEXT NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            messages INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS message_archive_pairs (
+            user_low INTEGER NOT NULL,
+            user_high INTEGER NOT NULL,
+            archive_id INTEGER NOT NULL,
+            min_id INTEGER NOT NULL,
+            max_id INTEGER NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            byte_length INTEGER NOT NULL,
+            line_start INTEGER NOT NULL,
+            line_end INTEGER NOT NULL,
+            PRIMARY KEY (user_low, user_high, archive_id),
+            FOREIGN KEY (archive_id) REFERENCES message_archives(id)
+        ) WITHOUT ROWID''',
+    )),
+    # 가격 정렬 커서는 정수 가격을 전제로 한다: 예전 경로로 들어간 문자열/실수 가격을 0 이상의 정수로 바꾼다
+    (10, 'integer item prices', (
+        "UPDATE items SET price = CAST(REPLACE(price, ',', '') AS INTEGER) WHERE typeof(price) = 'text'",
+        "UPDATE items SET price = CAST(ROUND(price) AS INTEGER) WHERE typeof(price) = 'real'",
+        "UPDATE items SET price = 0 WHERE typeof(price) != 'integer' OR price < 0",
+    )),
+]
+
+
+def current_version(conn):
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    if not conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone():
+        # 새 DB 는 처음부터 incremental auto_vacuum (지운 공간을 retention.py 가 조금씩 반환할 수 있도록)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    conn.commit()
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        # 여러 워커가 동시에 시작해도 한 번만 적용되도록 쓰기 잠금을 먼저 잡는다
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                conn.rollback()
+                continue
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((version, name))
+    return applied
+
+
+if __name__ == '__main__':
+    conn = connect()
+    for version, name in migrate(conn):
+        print(f'✅ {version}: {name}')
+    print(f'현재 스키마 버전: {current_version(conn)}')
+    conn.close()
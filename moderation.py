@@ -0,0 +1,165 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from db import connect
+from migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+# 고유 신고자 수가 이 값 이상이면 자동 조치 (유저 정지 / 상품 삭제)
+REPORT_USER_THRESHOLD = int(os.environ.get('TINYSHOP_REPORT_USER_THRESHOLD', '3'))
+REPORT_ITEM_THRESHOLD = int(os.environ.get('TINYSHOP_REPORT_ITEM_THRESHOLD', '3'))
+MODERATION_POLL_INTERVAL = float(os.environ.get('TINYSHOP_MODERATION_POLL_SECONDS', '1'))
+MODERATION_BATCH_SIZE = 100
+
+# target_type -> (reports 컬럼, 대기열 action)
+TARGETS = {
+    'user': ('target_user_id', 'suspend_user'),
+    'item': ('target_item_id', 'delete_item'),
+}
+ACTIONS = {
+    'suspend_user': 'UPDATE users SET is_suspended = 1 WHERE id = ?',
+    'delete_item': 'DELETE FROM items WHERE id = ?',
+}
+
+
+def threshold(target_type):
+    return REPORT_USER_THRESHOLD if target_type == 'user' else REPORT_ITEM_THRESHOLD
+
+
+def _count_reporter(cur, target_type, target_id, reporter_id, report_id):
+    column, action = TARGETS[target_type]
+    # 같은 신고자의 이전 신고가 있으면 카운터를 올리지 않는다 ((대상, 신고자) 인덱스 조회)
+    cur.execute(f'SELECT 1 FROM reports WHERE {column} = ? AND reporter_id = ? AND id != ? LIMIT 1',
+                (target_id, reporter_id, report_id))
+    if cur.fetchone():
+        return False
+    cur.execute('''INSERT INTO report_counts (target_type, target_id, reporters) VALUES (?, ?, 1)
+                   ON CONFLICT (target_type, target_id) DO UPDATE SET reporters = reporters + 1''',
+                (target_type, target_id))
+    cur.execute('SELECT reporters, actioned FROM report_counts WHERE target_type = ? AND target_id = ?',
+                (target_type, target_id))
+    reporters, actioned = cur.fetchone()
+    if actioned or reporters < threshold(target_type):
+        return False
+    cur.execute('UPDATE report_counts SET actioned = 1 WHERE target_type = ? AND target_id = ?',
+                (target_type, target_id))
+    cur.execute('INSERT INTO moderation_queue (action, target_id) VALUES (?, ?)', (action, target_id))
+    return True
+
+
+def record_report(conn, reporter_id, target_user_id, target_item_id, reason):
+    # 신고를 저장하고 카운터를 갱신한다. 자동 조치가 대기열에 들어갔으면 True
+    cur = conn.cursor()
+    cur.execute('INSERT INTO reports (reporter_id, target_user_id, target_item_id, reason) VALUES (?, ?, ?, ?)',
+                (reporter_id, target_user_id, target_item_id, reason))
+    report_id = cur.lastrowid
+    queued = False
+    if target_user_id:
+        queued |= _count_reporter(cur, 'user', target_user_id, reporter_id, report_id)
+    if target_item_id:
+        queued |= _count_reporter(cur, 'item', target_item_id, reporter_id, report_id)
+    conn.commit()
+    return queued
+
+
+# moderation_queue 를 처리하는 백그라운드 작업자. 요청 경로에서는 대기열에 넣기만 한다
+class ModerationWorker:
+    def __init__(self, path=None, interval=MODERATION_POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.processed = 0
+        self.listeners = []
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='moderation-worker', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = connect(self.path)
+        while not self._stopping:
+            try:
+                while self.process(conn):
+                    pass
+            except Exception:
+                logger.exception('moderation batch failed')
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        conn.close()
+
+    def process(self, conn):
+        # 대기 중인 작업을 한 트랜잭션으로 처리. 처리한 작업 수 반환
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            jobs = conn.execute('SELECT id, action, target_id FROM moderation_queue WHERE processed_at IS NULL '
+                                'ORDER BY id LIMIT ?', (MODERATION_BATCH_SIZE,)).fetchall()
+            for job in jobs:
+                conn.execute(ACTIONS[job['action']], (job['target_id'],))
+                conn.execute('UPDATE moderation_queue SET processed_at = CURRENT_TIMESTAMP WHERE id = ?', (job['id'],))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        for job in jobs:
+            for listener in self.listeners:
+                listener(job['action'], job['target_id'])
+        self.processed += len(jobs)
+        return len(jobs)
+
+
+def benchmark(reports=10000000, users=1000, items=100, samples=2000):
+    # 신고 수가 많은 DB 에서 신고 1건 처리 지연: python moderation.py [기존 신고 수]
+    # 비교용으로 예전 요청 경로가 신고마다 돌리던 COUNT(*) 조회 지연도 잰다
+    from seed_data import rebuild_report_counts
+    # 적재 INSERT 의 느린 쿼리 경고는 측정과 무관하므로 끈다
+    logging.getLogger('db').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = connect(os.path.join(workdir, 'tinyshop.db'))
+        migrate(conn)
+        start = time.perf_counter()
+        with conn:
+            # 절반은 사용자, 절반은 상품 대상 (상품당 reports / 2 / items 건)
+            conn.execute('''INSERT INTO reports (reporter_id, target_user_id, target_item_id, reason)
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                SELECT 1 + i % ?, CASE WHEN i % 2 THEN 1 + i / 2 % ? END, CASE WHEN i % 2 = 0 THEN 1 + i / 2 % ? END,
+                       'spam' FROM n''', (reports, users, users, items))
+        rebuild_report_counts(conn)
+        conn.execute('ANALYZE')
+        print(f'{reports:,} reports loaded in {time.perf_counter() - start:.1f}s')
+        cases = [
+            ('record_report (new reporter)', lambda i: record_report(conn, users + 1 + i, None, 1 + i % items, 'spam')),
+            ('record_report (repeat reporter)', lambda i: record_report(conn, 1 + i % users, None, 1 + i % items, 'spam')),
+            ('old COUNT(*) per report', lambda i: conn.execute(
+                'SELECT COUNT(*) FROM reports WHERE target_item_id = ?', (1 + i % items,)).fetchone()),
+        ]
+        for label, fn in cases:
+            latencies = []
+            for i in range(samples):
+                start = time.perf_counter()
+                fn(i)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(f'  {label:32} p50 {latencies[len(latencies) // 2] * 1000:7.3f} ms'
+                  f'  p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.3f} ms')
+        conn.close()
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000000)
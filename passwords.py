@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+import metrics
+
+# bcrypt 비용(cost) 계수. 바꾸면 다음 로그인 때 자동으로 재해싱된다
+BCRYPT_ROUNDS = int(os.environ.get('TINYSHOP_BCRYPT_ROUNDS', '12'))
+# 동시에 해싱하는 스레드 수 / 대기열을 포함한 최대 동시 요청 수
+HASH_WORKERS = int(os.environ.get('TINYSHOP_HASH_WORKERS', str(os.cpu_count() or 2)))
+HASH_MAX_PENDING = int(os.environ.get('TINYSHOP_HASH_MAX_PENDING', '64'))
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+# bcrypt 연산을 이벤트 루프 밖의 스레드에서 실행하는 제한된 작업 풀
+class HashPool:
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.green = False
+
+    def run(self, fn, *args):
+        # 대기열이 가득 차면 기다리지 않고 바로 거절 (호출 측에서 503 응답)
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        start = time.perf_counter()
+        try:
+            if self.green:
+                # eventlet 허브를 막지 않도록 OS 스레드에서 실행하고 그린렛만 양보.
+                # tpool 은 self._executor 와 별개 스레드 풀이라 configure() 에서 HASH_WORKERS 로 맞춘다
+                from eventlet import tpool
+                return tpool.execute(fn, *args)
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+            metrics.hash_latency.observe(time.perf_counter() - start, fn.__name__)
+
+
+pool = HashPool()
+
+
+def configure(async_mode):
+    pool.green = async_mode == 'eventlet'
+    if pool.green:
+        # tpool 스레드 수 기본값(EVENTLET_THREADPOOL_SIZE, 20)을 무시하고 해싱 스레드 수 상한을 적용.
+        # 첫 tpool.execute 전에 호출되어야 한다
+        from eventlet import tpool
+        tpool.set_num_threads(HASH_WORKERS)
+
+
+def _encode(hashed):
+    return hashed.encode('utf-8') if isinstance(hashed, str) else hashed
+
+
+def hash_password(password):
+    # DB 에는 항상 str 로 저장 (예전에 bytes 로 저장된 해시도 check_password/needs_rehash 에서 읽을 수 있다)
+    return pool.run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def check_password(password, hashed):
+    return pool.run(bcrypt.checkpw, password.encode('utf-8'), _encode(hashed))
+
+
+def needs_rehash(hashed):
+    # $2b$12$... 형식에서 비용 계수를 읽는다
+    try:
+        return int(_encode(hashed).split(b'$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+import time
+
+import socketio
+
+from db import sqlite_url_path
+
+# 외부 서비스 없이 여러 워커 프로세스가 emit 을 공유하기 위한 SQLite 기반 브로커
+PUBSUB_POLL_INTERVAL = float(os.environ.get('TINYSHOP_PUBSUB_POLL_MS', '10')) / 1000
+PUBSUB_RETENTION = float(os.environ.get('TINYSHOP_PUBSUB_RETENTION', '60'))
+PUBSUB_PRUNE_INTERVAL = 5
+
+
+class SqliteManager(socketio.PubSubManager):
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///tinyshop_pubsub.db', channel='flask-socketio', write_only=False,
+                 logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = sqlite_url_path(url)
+        self._pub_conn = None
+        self._pub_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA busy_timeout = 5000')
+        conn.execute('''CREATE TABLE IF NOT EXISTS pubsub_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pubsub_events_channel ON pubsub_events (channel, id)')
+        return conn
+
+    def _publish(self, data):
+        with self._pub_lock:
+            if self._pub_conn is None:
+                self._pub_conn = self._connect()
+            self._pub_conn.execute('INSERT INTO pubsub_events (channel, payload, created_at) VALUES (?, ?, ?)',
+                                   (self.channel, self.json.dumps(data), time.time()))
+
+    def _listen(self):
+        conn = self._connect()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM pubsub_events').fetchone()[0]
+        next_prune = time.monotonic() + PUBSUB_PRUNE_INTERVAL
+        while True:
+            rows = conn.execute('SELECT id, payload FROM pubsub_events WHERE channel = ? AND id > ? ORDER BY id',
+                                (self.channel, last_id)).fetchall()
+            for event_id, payload in rows:
+                last_id = event_id
+                yield payload
+            if time.monotonic() >= next_prune:
+                # 모든 워커가 이미 읽었을 오래된 이벤트 정리 (AUTOINCREMENT 라 id 는 재사용되지 않음)
+                conn.execute('DELETE FROM pubsub_events WHERE id <= ? AND created_at < ?',
+                             (last_id, time.time() - PUBSUB_RETENTION))
+                next_prune = time.monotonic() + PUBSUB_PRUNE_INTERVAL
+            if not rows:
+                self.server.sleep(PUBSUB_POLL_INTERVAL)
+
+
+# 다른 워커에서 온 emit 을 앱에 알려주는 훅 (예: 로컬 채팅 버퍼 무효화)
+class RemoteEmitHook:
+    on_remote_emit = None
+
+    def _handle_emit(self, message):
+        if message.get('host_id') != self.host_id and self.on_remote_emit is not None:
+            self.on_remote_emit(message)
+        return super()._handle_emit(message)
+
+
+def manager_class(url):
+    if url.startswith('sqlite://'):
+        return SqliteManager
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager
+    if url.startswith('zmq'):
+        return socketio.ZmqManager
+    return socketio.KombuManager
+
+
+def create_client_manager(url, channel='flask-socketio'):
+    # url 이 비어 있으면 단일 프로세스 모드 (None)
+    if not url:
+        return None
+    base = manager_class(url)
+    cls = type(f'Hooked{base.__name__}', (RemoteEmitHook, base), {})
+    return cls(url, channel=channel)
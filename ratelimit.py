@@ -0,0 +1,172 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from db import sqlite_url_path
+
+# 규칙 이름 -> (초당 보충 토큰 수, 버킷 크기). TINYSHOP_RATE_LIMITS="message=20/50,report=1/5" 로 덮어쓰고
+# 초당 토큰 수를 0 으로 주면 그 규칙은 끈다.
+DEFAULT_RATE_LIMITS = {
+    'ip': (50, 100),          # IP 당 전체 요청
+    'login': (1, 10),         # IP 당 로그인 시도
+    'register': (0.2, 5),     # IP 당 회원가입
+    'item_write': (1, 10),    # 사용자 당 상품 등록/수정/삭제
+    'report': (0.5, 5),       # 사용자 당 신고
+    'transfer': (2, 10),      # 사용자 당 송금
+    'message': (10, 30),      # 사용자 당 채팅 메시지
+}
+# 메모리 버킷 최대 개수 (넘으면 가장 오래 안 쓰인 키부터 버린다 = 가득 찬 새 버킷과 같음)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('TINYSHOP_RATE_LIMIT_MAX_KEYS', '100000'))
+# 여러 워커가 버킷을 공유할 저장소 (예: sqlite:///tinyshop_ratelimit.db). 비어 있으면 워커별 메모리
+RATE_LIMIT_URL = os.environ.get('TINYSHOP_RATE_LIMIT_URL', '')
+# 동시에 처리하는 쓰기 요청 수 상한과 빈자리를 기다리는 시간
+MAX_CONCURRENT_WRITES = int(os.environ.get('TINYSHOP_MAX_CONCURRENT_WRITES', '16'))
+WRITE_ADMISSION_TIMEOUT = float(os.environ.get('TINYSHOP_WRITE_ADMISSION_TIMEOUT', '0.1'))
+# X-Forwarded-For 를 믿을 프록시 주소 (UI 서버가 원래 클라이언트 IP 를 넘겨준다)
+TRUSTED_PROXIES = frozenset(filter(None, os.environ.get('TINYSHOP_TRUSTED_PROXIES', '127.0.0.1,::1').split(',')))
+SHARED_PRUNE_INTERVAL = 60
+
+
+def parse_limits(raw, defaults=DEFAULT_RATE_LIMITS):
+    limits = dict(defaults)
+    for part in filter(None, (p.strip() for p in raw.split(','))):
+        name, _, spec = part.partition('=')
+        rate, _, burst = spec.partition('/')
+        limits[name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+def client_ip(request):
+    forwarded = request.headers.get('X-Forwarded-For')
+    if forwarded and request.remote_addr in TRUSTED_PROXIES:
+        # 마지막 항목이 신뢰하는 프록시가 직접 본 주소
+        return forwarded.split(',')[-1].strip()
+    return request.remote_addr
+
+
+def refill(tokens, updated, rate, burst, now):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost, now):
+        # 토큰을 꺼낼 수 있으면 0, 아니면 다시 시도할 때까지 기다릴 초
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = refill(tokens, updated, rate, burst, now)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SqliteBuckets:
+    # 워커 프로세스끼리 버킷을 공유 (본 DB 의 쓰기 잠금과 겹치지 않도록 별도 파일)
+    def __init__(self, url):
+        self.path = sqlite_url_path(url)
+        self._local = threading.local()
+        self._next_prune = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute('PRAGMA busy_timeout = 1000')
+            conn.execute('''CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID''')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost, now):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = refill(row[0], row[1], rate, burst, now) if row else burst
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            if now >= self._next_prune:
+                # 한 시간 넘게 안 쓰인 버킷은 이미 가득 찼으므로 지워도 결과가 같다
+                conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - 3600,))
+                self._next_prune = now + SHARED_PRUNE_INTERVAL
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+def bucket_store(url=RATE_LIMIT_URL):
+    if url.startswith('sqlite://'):
+        return SqliteBuckets(url)
+    return MemoryBuckets()
+
+
+throttled = metrics.Counter('tinyshop_throttled_total', '거절된 요청/이벤트 수', ('rule', 'reason'))
+
+
+class RateLimiter:
+    def __init__(self, limits=None, store=None):
+        self.limits = limits if limits is not None else parse_limits(os.environ.get('TINYSHOP_RATE_LIMITS', ''))
+        self.store = store if store is not None else bucket_store()
+
+    def check(self, rule, key, cost=1):
+        # 허용되면 0, 아니면 Retry-After 로 쓸 초 (올림)
+        rate, burst = self.limits.get(rule, (0, 0))
+        if rate <= 0:
+            return 0
+        try:
+            wait = self.store.take(f'{rule}:{key}', rate, burst, cost, time.time())
+        except sqlite3.Error:
+            # 공유 저장소 장애로 서비스 전체를 막지는 않는다
+            return 0
+        if wait:
+            throttled.inc(rule, 'rate_limited')
+            return max(1, math.ceil(wait))
+        return 0
+
+
+class WriteGate:
+    # 쓰기 요청 동시 처리 수 제한. 자리가 나지 않으면 DB 잠금 대기열에 쌓이기 전에 거절한다
+    def __init__(self, limit=MAX_CONCURRENT_WRITES, timeout=WRITE_ADMISSION_TIMEOUT):
+        self.limit = limit
+        self.timeout = timeout
+        self.active = 0
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    def enter(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            throttled.inc('write_gate', 'overloaded')
+            return False
+        with self._lock:
+            self.active += 1
+        return True
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# 상품 상세 / 사용자 프로필 조회용 프로세스 내 캐시 (LRU + TTL)
+# 쓰기 경로에서 키 단위로 무효화하고, TTL 은 다른 워커의 무효화가 늦게 도착하는 경우의 안전장치
+READ_CACHE_SIZE = int(os.environ.get('TINYSHOP_READ_CACHE_SIZE', '10000'))
+READ_CACHE_TTL = float(os.environ.get('TINYSHOP_READ_CACHE_TTL', '30'))
+
+
+class TTLCache:
+    def __init__(self, name, size=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        caches.append(self)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self):
+        # DB 에서 읽기 전에 받아 두고 put 에 넘긴다. 그 사이 무효화가 있었으면 저장하지 않음
+        return self.invalidations
+
+    def put(self, key, value, generation):
+        with self._lock:
+            if generation != self.invalidations:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+caches = []
+
+
+def _cache_samples(field):
+    return lambda: {(cache.name,): cache.stats()[field] for cache in caches}
+
+
+metrics.Counter('tinyshop_read_cache_hits_total', '읽기 캐시 적중 수', ('cache',), fn=_cache_samples('hits'))
+metrics.Counter('tinyshop_read_cache_misses_total', '읽기 캐시 미스 수', ('cache',), fn=_cache_samples('misses'))
+metrics.Counter('tinyshop_read_cache_evictions_total', '용량 초과로 밀려난 항목 수', ('cache',), fn=_cache_samples('evictions'))
+metrics.Counter('tinyshop_read_cache_invalidations_total', '무효화 횟수', ('cache',), fn=_cache_samples('invalidations'))
+metrics.Gauge('tinyshop_read_cache_entries', '캐시 항목 수', ('cache',), fn=_cache_samples('size'))
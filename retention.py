@@ -0,0 +1,290 @@
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import os
+import random
+import time
+import zlib
+
+from db import DB_PATH, connect
+
+logger = logging.getLogger(__name__)
+
+# 이보다 오래된 메시지는 압축 아카이브로 옮기고 DB 에서 지운다
+RETENTION_DAYS = float(os.environ.get('TINYSHOP_MESSAGE_RETENTION_DAYS', '180'))
+# 아카이브 파일 위치 (월 단위 디렉터리: <ARCHIVE_DIR>/2026/09/messages-<first_id>-<last_id>.jsonl.gz).
+# 목록에는 이 디렉터리 기준 상대 경로만 남으므로 API 서버와 retention.py 가 같은 값을 써야 한다
+ARCHIVE_DIR = os.environ.get('TINYSHOP_ARCHIVE_DIR', os.path.join(os.path.dirname(DB_PATH), 'archive', 'messages'))
+# 한 번에 읽어 아카이브 파일로 쓰는 메시지 수 / 한 트랜잭션에서 지우는 메시지 수
+ARCHIVE_BATCH_SIZE = int(os.environ.get('TINYSHOP_ARCHIVE_BATCH_SIZE', '20000'))
+DELETE_BATCH_SIZE = int(os.environ.get('TINYSHOP_ARCHIVE_DELETE_BATCH', '500'))
+# 삭제/vacuum 단계 사이에 쉬는 시간 (그 사이 채팅 작성기가 쓰기 잠금을 잡을 수 있도록)
+ARCHIVE_PAUSE_MS = float(os.environ.get('TINYSHOP_ARCHIVE_PAUSE_MS', '10'))
+# incremental_vacuum 한 번에 반환하는 페이지 수
+VACUUM_PAGES = int(os.environ.get('TINYSHOP_VACUUM_PAGES', '1000'))
+# 아카이브 파일 안의 gzip 블록 크기 (압축 전, 대화 쌍 경계에서 자른다)
+ARCHIVE_BLOCK_BYTES = int(os.environ.get('TINYSHOP_ARCHIVE_BLOCK_BYTES', str(64 * 1024)))
+AUTO_VACUUM_INCREMENTAL = 2
+GZIP_WBITS = 31
+ARCHIVE_COLUMNS = ('id', 'sender_id', 'receiver_id', 'message', 'timestamp')
+
+OLD_MESSAGES_SQL = '''SELECT id, sender_id, receiver_id, message, timestamp FROM messages
+                      WHERE timestamp < ? ORDER BY timestamp LIMIT ?'''
+DELETE_MESSAGES_SQL = 'DELETE FROM messages WHERE id IN (SELECT value FROM json_each(?))'
+ARCHIVED_PAIR_SQL = '''SELECT a.path, p.byte_offset, p.byte_length, p.line_start, p.line_end, p.max_id
+                       FROM message_archive_pairs p
+                       JOIN message_archives a ON a.id = p.archive_id
+                       WHERE p.user_low = ? AND p.user_high = ? AND p.min_id < ?
+                       ORDER BY p.max_id DESC'''
+
+
+def cutoff_timestamp(days, now=None):
+    # messages.timestamp 와 같은 형식 (UTC)
+    now = now or datetime.datetime.utcnow()
+    return (now - datetime.timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def pair_key(message):
+    return min(message['sender_id'], message['receiver_id']), max(message['sender_id'], message['receiver_id'])
+
+
+def write_archive(conn, period, messages, archive_dir=ARCHIVE_DIR, block_bytes=ARCHIVE_BLOCK_BYTES):
+    # 대화 쌍 순으로 정렬해 약 block_bytes 단위 gzip 멤버로 이어 붙인다 (파일 전체는 zcat 으로 읽히는 보통 .gz).
+    # 쌍마다 블록의 파일 내 위치와 블록 안에서 자기 줄들의 범위를 DB 에 기록해 두면
+    # 이력 조회 때 그 블록만 풀고 해당 줄만 파싱하면 된다
+    messages = sorted(messages, key=lambda m: (pair_key(m), m['id']))
+    first_id = min(m['id'] for m in messages)
+    last_id = max(m['id'] for m in messages)
+    rel_path = os.path.join(period[:4], period[5:7], f'messages-{first_id}-{last_id}.jsonl.gz')
+    if conn.execute('SELECT 1 FROM message_archives WHERE path = ?', (rel_path,)).fetchone():
+        # 이전 실행이 파일과 목록을 기록한 뒤 지우기 전에 멈춘 경우. 파일은 목록보다 먼저 끝까지 써졌으므로
+        # 그대로 두고 호출 측이 삭제만 이어서 하게 한다
+        logger.info('archive %s already recorded; resuming delete', rel_path)
+        return rel_path
+    path = os.path.join(archive_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pairs = []
+    offset = 0
+    with open(path + '.tmp', 'wb') as f:
+        block, block_size, block_pairs = [], 0, []
+        start = 0
+        for i in range(1, len(messages) + 1):
+            if i < len(messages) and pair_key(messages[i]) == pair_key(messages[start]):
+                continue
+            group = messages[start:i]
+            start = i
+            line_start = block_size
+            for m in group:
+                line = (json.dumps([m[c] for c in ARCHIVE_COLUMNS], ensure_ascii=False, separators=(',', ':'))
+                        + '\n').encode('utf-8')
+                block.append(line)
+                block_size += len(line)
+            block_pairs.append(pair_key(group[0]) + (group[0]['id'], group[-1]['id'], line_start, block_size))
+            if block_size < block_bytes and i < len(messages):
+                continue
+            member = gzip.compress(b''.join(block), mtime=0)
+            f.write(member)
+            pairs.extend(pair + (offset, len(member)) for pair in block_pairs)
+            offset += len(member)
+            block, block_size, block_pairs = [], 0, []
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+    with conn:
+        cur = conn.execute('''INSERT INTO message_archives (path, period, first_id, last_id, messages, bytes)
+                              VALUES (?, ?, ?, ?, ?, ?)''', (rel_path, period, first_id, last_id, len(messages), offset))
+        archive_id = cur.lastrowid
+        conn.executemany('''INSERT INTO message_archive_pairs
+                            (user_low, user_high, archive_id, min_id, max_id, byte_offset, byte_length,
+                             line_start, line_end)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         [(low, high, archive_id, min_id, max_id, off, length, line_start, line_end)
+                          for low, high, min_id, max_id, line_start, line_end, off, length in pairs])
+    return rel_path
+
+
+def delete_messages(conn, ids, batch_size=DELETE_BATCH_SIZE, pause_ms=ARCHIVE_PAUSE_MS):
+    # 짧은 트랜잭션 여러 개로 나눠 지운다 (긴 쓰기 잠금으로 채팅 기록을 막지 않도록)
+    for i in range(0, len(ids), batch_size):
+        with conn:
+            conn.execute(DELETE_MESSAGES_SQL, (json.dumps(ids[i:i + batch_size]),))
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+
+
+def archive_messages(conn, cutoff, batch_size=ARCHIVE_BATCH_SIZE, archive_dir=ARCHIVE_DIR):
+    # cutoff 보다 오래된 메시지를 월별 아카이브 파일로 옮긴다. (옮긴 메시지 수, 만든 파일 목록) 반환.
+    # 파일과 목록을 먼저 기록한 뒤 지우므로 중간에 멈추면 일부가 DB 와 아카이브에 겹칠 뿐 유실은 없다
+    # (이력 조회는 id 로 중복을 제거하고, 다시 실행하면 이미 기록된 파일은 재사용한다)
+    moved = 0
+    files = []
+    while True:
+        rows = [dict(row) for row in conn.execute(OLD_MESSAGES_SQL, (cutoff, batch_size)).fetchall()]
+        if not rows:
+            break
+        periods = {}
+        for row in rows:
+            periods.setdefault(row['timestamp'][:7], []).append(row)
+        for period, messages in sorted(periods.items()):
+            files.append(write_archive(conn, period, messages, archive_dir))
+        delete_messages(conn, [row['id'] for row in rows])
+        moved += len(rows)
+        logger.info('archived %d messages (total %d)', len(rows), moved)
+    return moved, files
+
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES, pause_ms=ARCHIVE_PAUSE_MS):
+    # 빈 페이지를 조금씩 파일 끝에서 잘라낸다. auto_vacuum=INCREMENTAL 인 DB 에서만 동작
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        logger.warning('auto_vacuum is not INCREMENTAL; run with --enable-auto-vacuum once to convert the DB')
+        return 0
+    freed = 0
+    while True:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not free:
+            break
+        # execute() 는 이 PRAGMA 를 한 단계만 실행하므로 executescript 로 끝까지 돌린다
+        conn.executescript(f'PRAGMA incremental_vacuum({pages});')
+        freed += min(free, pages)
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+    # WAL 에 쌓인 페이지를 본 파일로 옮기고 WAL 파일도 비운다
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+    return freed
+
+
+def enable_auto_vacuum(conn):
+    # 기존 DB 는 전체 VACUUM 한 번이 필요하다 (DB 전체를 다시 쓰는 동안 쓰기가 막히므로 점검 시간에 실행)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+
+def read_archived(path, offset, length, line_start, line_end, archive_dir=ARCHIVE_DIR):
+    # 블록을 해당 대화 쌍의 줄 끝까지만 풀고 그 줄들만 파싱한다
+    with open(os.path.join(archive_dir, path), 'rb') as f:
+        f.seek(offset)
+        data = zlib.decompressobj(GZIP_WBITS).decompress(f.read(length), line_end)[line_start:]
+    return [dict(zip(ARCHIVE_COLUMNS, json.loads(line))) for line in data.splitlines()]
+
+
+def merge_archived(conn, user1, user2, before, limit, rows, archive_dir=ARCHIVE_DIR):
+    # DB 에서 읽은 이력(rows, 오래된 것부터)에 아카이브된 메시지를 합쳐 최근 limit 개를 돌려준다.
+    # 아카이브는 보관 기간보다 오래된 메시지뿐이라 DB 만으로 한 페이지가 차면 볼 필요가 없고,
+    # 아카이브가 없는 대화는 PK 조회 한 번으로 끝난다
+    if len(rows) >= limit:
+        return rows
+    low, high = min(user1, user2), max(user1, user2)
+    entries = conn.execute(ARCHIVED_PAIR_SQL, (low, high, before)).fetchall()
+    if not entries:
+        return rows
+    merged = {row['id']: row for row in rows}
+    for path, offset, length, line_start, line_end, max_id in entries:
+        if len(merged) >= limit and max_id <= sorted(merged)[-limit]:
+            # 이 파일(과 그보다 오래된 파일)의 메시지는 이미 모은 최근 limit 개보다 모두 오래됐다
+            break
+        try:
+            archived = read_archived(path, offset, length, line_start, line_end, archive_dir)
+        except OSError:
+            logger.exception('failed to read message archive %s', path)
+            continue
+        for message in archived:
+            if message['id'] < before:
+                merged.setdefault(message['id'], message)
+    return [merged[i] for i in sorted(merged)[-limit:]]
+
+
+def db_stats(conn, path=DB_PATH):
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    files = [path, path + '-wal']
+    return {
+        'messages': conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0],
+        'db_bytes': page_size * page_count,
+        'free_bytes': page_size * freelist,
+        'file_bytes': sum(os.path.getsize(f) for f in files if os.path.exists(f)),
+    }
+
+
+def sample_pairs(conn, count, seed=0):
+    # 메시지 id 를 무작위로 골라 그 대화 쌍과 id 를 쓴다 (아카이브 전후 같은 표본으로 비교)
+    # MIN/MAX 를 한 문장에 쓰면 rowid 최적화가 안 되므로 따로 조회
+    bounds = (conn.execute('SELECT MIN(id) FROM messages').fetchone()[0],
+              conn.execute('SELECT MAX(id) FROM messages').fetchone()[0])
+    if bounds[0] is None:
+        return []
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        row = conn.execute('SELECT id, sender_id, receiver_id FROM messages WHERE id >= ? LIMIT 1',
+                           (rng.randint(*bounds),)).fetchone()
+        samples.append((row[1], row[2], row[0]))
+    return samples
+
+
+def history_latency(conn, samples, limit=50):
+    # 대화 쌍별 최신 페이지 / 표본 메시지 직전 페이지 조회 시간(ms) 중앙값과 p95
+    from chat_store import load_history
+    timings = {'latest': [], 'older': []}
+    for user1, user2, message_id in samples:
+        for name, before in (('latest', None), ('older', message_id)):
+            start = time.perf_counter()
+            load_history(conn, user1, user2, before, limit)
+            timings[name].append((time.perf_counter() - start) * 1000)
+    result = {}
+    for name, values in timings.items():
+        values.sort()
+        if values:
+            result[f'{name}_p50_ms'] = round(values[len(values) // 2], 3)
+            result[f'{name}_p95_ms'] = round(values[int(len(values) * 0.95)], 3)
+    return result
+
+
+def print_report(label, stats):
+    print(f'[{label}] ' + ', '.join(f'{k}={v:,}' if isinstance(v, int) else f'{k}={v}' for k, v in stats.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='오래된 채팅 메시지를 압축 아카이브로 옮기고 DB 공간을 반환')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--days', type=float, default=RETENTION_DAYS, help='보관 기간(일)')
+    parser.add_argument('--samples', type=int, default=200, help='지연 측정에 쓸 대화 쌍 수 (0 이면 측정 생략)')
+    parser.add_argument('--dry-run', action='store_true', help='옮길 메시지 수만 출력')
+    parser.add_argument('--enable-auto-vacuum', action='store_true',
+                        help='기존 DB 를 auto_vacuum=INCREMENTAL 로 전환 (전체 VACUUM 1회)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    conn = connect(args.db)
+    cutoff = cutoff_timestamp(args.days)
+    if args.dry_run:
+        count = conn.execute('SELECT COUNT(*) FROM messages WHERE timestamp < ?', (cutoff,)).fetchone()[0]
+        print(f'{cutoff} 이전 메시지 {count:,}건이 아카이브 대상입니다.')
+        return
+    if args.enable_auto_vacuum:
+        enable_auto_vacuum(conn)
+    samples = sample_pairs(conn, args.samples)
+    before = db_stats(conn, args.db)
+    before.update(history_latency(conn, samples))
+    print_report('before', before)
+
+    start = time.perf_counter()
+    moved, files = archive_messages(conn, cutoff)
+    archived_in = time.perf_counter() - start
+    start = time.perf_counter()
+    freed = incremental_vacuum(conn)
+    vacuumed_in = time.perf_counter() - start
+    print(f'✅ {cutoff} 이전 메시지 {moved:,}건 -> 아카이브 {len(files)}개 ({archived_in:.1f}초), '
+          f'빈 페이지 {freed:,}개 반환 ({vacuumed_in:.1f}초)')
+
+    after = db_stats(conn, args.db)
+    after.update(history_latency(conn, samples))
+    print_report('after', after)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import os
+import signal
+import subprocess
+import sys
+
+# app.py 를 N 개의 워커 프로세스로 실행 (포트 BASE_PORT, BASE_PORT+1, ...)
+# 워커들은 TINYSHOP_SOCKETIO_QUEUE 로 emit 을 공유한다.
+# Socket.IO 는 세션이 한 워커에 고정되어야 하므로, ui_app.py 는 TINYSHOP_SOCKETIO_URLS 목록에서
+# 사용자 id 로 워커를 골라 같은 사용자가 항상 같은 워커에 붙도록 한다.
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get('TINYSHOP_WORKERS', '2'))
+BASE_PORT = int(os.environ.get('TINYSHOP_BASE_PORT', '5000'))
+DEFAULT_QUEUE = 'sqlite:///tinyshop_pubsub.db'
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def worker_env(port):
+    env = dict(os.environ)
+    env.setdefault('TINYSHOP_SOCKETIO_QUEUE', DEFAULT_QUEUE)
+    env['TINYSHOP_PORT'] = str(port)
+    env['TINYSHOP_DEBUG'] = '0'
+    return env
+
+
+def main():
+    ports = [BASE_PORT + i for i in range(WORKERS)]
+    procs = [subprocess.Popen([sys.executable, APP_PATH], env=worker_env(port)) for port in ports]
+    urls = ','.join(f'http://127.0.0.1:{port}' for port in ports)
+    print(f'✅ 워커 {WORKERS}개 실행 중: {urls}')
+    print(f'   ui_app.py 실행 시 TINYSHOP_SOCKETIO_URLS={urls}')
+    try:
+        for proc in procs:
+            proc.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGINT)
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
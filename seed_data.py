@@ -0,0 +1,175 @@
+import argparse
+import random
+import time
+
+import bcrypt
+
+from db import connect
+from migrations import migrate
+
+# 부하 테스트용 대량 데이터 생성기 (python seed_data.py --users 1000000 ...)
+# 적재하는 동안은 저널/동기화를 끄고 배치 단위 executemany 로 넣는다.
+# 중간에 중단되면 DB 가 깨질 수 있으므로 운영 DB 가 아닌 테스트용 DB 에만 사용할 것.
+SEED_PASSWORD = 'seed-password'
+SEED_EMAIL = 'seed{}@example.com'
+SEED_BCRYPT_ROUNDS = 4
+
+TITLE_WORDS = ('아이폰', '갤럭시', '맥북', '아이패드', '에어팟', '자전거', '의자', '책상', '모니터', '키보드',
+               '카메라', '렌즈', '운동화', '패딩', '가방', '시계', '냉장고', '전자레인지', '책', '기타')
+TITLE_SUFFIXES = ('팝니다', '급처', '새상품', '미개봉', 'S급', '거의 새것', '중고', '상태 좋음')
+REASONS = ('사기 의심', '부적절한 게시물', '욕설', '허위 매물', '스팸')
+MESSAGES = ('안녕하세요', '아직 판매하시나요?', '네 판매중입니다', '가격 조정 가능할까요?', '직거래 가능하신가요?',
+            '내일 시간 되세요?', '감사합니다', '입금했습니다')
+
+LOAD_PRAGMAS = (
+    'PRAGMA locking_mode = EXCLUSIVE',
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA cache_size = -200000',
+)
+RESTORE_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA locking_mode = NORMAL',
+)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load(conn, label, sql, rows, total, batch_size):
+    start = time.perf_counter()
+    done = 0
+    for batch in batched(rows, batch_size):
+        conn.execute('BEGIN')
+        conn.executemany(sql, batch)
+        conn.execute('COMMIT')
+        done += len(batch)
+        print(f'\r  - {label}: {done}/{total}', end='', flush=True)
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed else 0
+    print(f'\r  - {label}: {done}건, {elapsed:.1f}초 ({rate:,.0f}건/초)')
+
+
+def user_rows(count, start_id, password_hash, rng):
+    for n in range(start_id, start_id + count):
+        yield SEED_EMAIL.format(n), password_hash, rng.randint(0, 100000), int(rng.random() < 0.01)
+
+
+def item_rows(count, user_ids, rng):
+    for _ in range(count):
+        word = rng.choice(TITLE_WORDS)
+        title = f'{word} {rng.choice(TITLE_SUFFIXES)}'
+        description = f'{word} {rng.choice(TITLE_SUFFIXES)} - {rng.randint(1, 99)}개월 사용'
+        yield title, description, rng.randint(1, 2000) * 1000, rng.randint(*user_ids)
+
+
+def report_rows(count, user_ids, item_ids, rng):
+    for _ in range(count):
+        reporter = rng.randint(*user_ids)
+        if rng.random() < 0.5 or item_ids[1] < item_ids[0]:
+            yield reporter, rng.randint(*user_ids), None, rng.choice(REASONS)
+        else:
+            yield reporter, None, rng.randint(*item_ids), rng.choice(REASONS)
+
+
+def message_rows(count, user_ids, rng, partners=20):
+    # 실제 채팅처럼 한 사용자는 소수의 상대와만 대화하도록 상대를 제한
+    for _ in range(count):
+        sender = rng.randint(*user_ids)
+        receiver = user_ids[0] + (sender * 7919 + rng.randrange(partners)) % (user_ids[1] - user_ids[0] + 1)
+        yield sender, receiver, rng.choice(MESSAGES)
+
+
+def max_id(conn, table):
+    return conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+
+
+def drop_triggers(conn, prefix):
+    # 행 단위 트리거를 잠시 빼고 적재 후 한 번에 재구성한다. 되돌릴 CREATE 문 목록 반환
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+                        (prefix + '%',)).fetchall()
+    for name, _ in rows:
+        conn.execute(f'DROP TRIGGER {name}')
+    return [sql for _, sql in rows]
+
+
+def rebuild_report_counts(conn):
+    # 신고 누적 카운터는 moderation.record_report 가 유지하므로 직접 넣은 신고는 다시 집계한다
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM report_counts')
+    conn.execute('''INSERT INTO report_counts (target_type, target_id, reporters)
+        SELECT 'user', target_user_id, COUNT(DISTINCT reporter_id) FROM reports
+        WHERE target_user_id IS NOT NULL GROUP BY target_user_id''')
+    conn.execute('''INSERT INTO report_counts (target_type, target_id, reporters)
+        SELECT 'item', target_item_id, COUNT(DISTINCT reporter_id) FROM reports
+        WHERE target_item_id IS NOT NULL GROUP BY target_item_id''')
+    conn.execute('COMMIT')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='부하 테스트용 데이터 생성')
+    parser.add_argument('--db', help='DB 파일 경로 (기본: tinyshop.db)')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--items', type=int, default=300000)
+    parser.add_argument('--reports', type=int, default=50000)
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = connect(args.db)
+    conn.isolation_level = None
+    migrate(conn)
+    # 모든 시드 사용자는 같은 비밀번호 (벤치마크에서 로그인용). 비용 계수는 낮게 두고 로그인 시 재해시된다
+    password_hash = bcrypt.hashpw(SEED_PASSWORD.encode('utf-8'), bcrypt.gensalt(SEED_BCRYPT_ROUNDS)).decode('utf-8')
+    for pragma in LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    start = time.perf_counter()
+    try:
+        load(conn, 'users', 'INSERT INTO users (email, password_hash, points, is_suspended) VALUES (?, ?, ?, ?)',
+             user_rows(args.users, max_id(conn, 'users') + 1, password_hash, rng), args.users, args.batch_size)
+        users = (1, max_id(conn, 'users'))
+
+        # 전문 검색 색인은 행마다 갱신하는 대신 적재 후 한 번에 다시 만든다
+        fts_triggers = drop_triggers(conn, 'items_fts_')
+        load(conn, 'items', 'INSERT INTO items (title, description, price, seller_id) VALUES (?, ?, ?, ?)',
+             item_rows(args.items, users, rng), args.items, args.batch_size)
+        items = (1, max_id(conn, 'items'))
+        for sql in fts_triggers:
+            conn.execute(sql)
+        rebuild_start = time.perf_counter()
+        conn.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+        print(f'  - items_fts rebuild: {time.perf_counter() - rebuild_start:.1f}초')
+
+        load(conn, 'reports', 'INSERT INTO reports (reporter_id, target_user_id, target_item_id, reason) VALUES (?, ?, ?, ?)',
+             report_rows(args.reports, users, items, rng), args.reports, args.batch_size)
+        rebuild_report_counts(conn)
+
+        load(conn, 'messages', 'INSERT INTO messages (sender_id, receiver_id, message) VALUES (?, ?, ?)',
+             message_rows(args.messages, users, rng), args.messages, args.batch_size)
+
+        print('  - ANALYZE')
+        conn.execute('ANALYZE')
+    finally:
+        for pragma in RESTORE_PRAGMAS:
+            conn.execute(pragma)
+        # 잠금 모드 해제는 다음 접근 때 적용되므로 한 번 읽어서 배타 잠금을 놓는다
+        conn.execute('SELECT 1 FROM users LIMIT 1').fetchall()
+        conn.close()
+    print(f'✅ 데이터 생성 완료 ({time.perf_counter() - start:.1f}초)')
+    print(f'   시드 사용자 로그인: {SEED_EMAIL.format("<id>")} / {SEED_PASSWORD}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import random
+import sqlite3
+import time
+
+# SQLITE_BUSY(잠금 대기 초과) 시 재시도 횟수 / 기본 대기 시간(초)
+TRANSFER_MAX_RETRIES = int(os.environ.get('TINYSHOP_TRANSFER_MAX_RETRIES', '5'))
+TRANSFER_BACKOFF = float(os.environ.get('TINYSHOP_TRANSFER_BACKOFF_MS', '5')) / 1000
+MAX_BATCH_SIZE = 100
+
+
+class TransferError(Exception):
+    status = 400
+
+
+class InsufficientPoints(TransferError):
+    status = 403
+
+    def __init__(self):
+        super().__init__('포인트가 부족합니다.')
+
+
+class RecipientNotFound(TransferError):
+    status = 404
+
+    def __init__(self):
+        super().__init__('수신자를 찾을 수 없습니다.')
+
+
+def is_busy(e):
+    message = str(e).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def with_retries(conn, fn):
+    # BEGIN IMMEDIATE 로 쓰기 잠금을 먼저 잡고, 잠금 경합이면 지터를 준 지수 백오프로 재시도
+    for attempt in range(TRANSFER_MAX_RETRIES + 1):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(conn.cursor())
+                conn.commit()
+                return result
+            except BaseException:
+                conn.rollback()
+                raise
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == TRANSFER_MAX_RETRIES:
+                raise
+            time.sleep(random.uniform(0, TRANSFER_BACKOFF * (2 ** attempt)))
+
+
+def _debit(cur, sender_id, amount):
+    # 잔액 확인과 차감을 조건부 UPDATE 한 번으로 처리
+    cur.execute('UPDATE users SET points = points - ? WHERE id = ? AND points >= ?', (amount, sender_id, amount))
+    if cur.rowcount == 0:
+        raise InsufficientPoints()
+
+
+def _credit(cur, sender_id, recipient_id, amount):
+    cur.execute('UPDATE users SET points = points + ? WHERE id = ?', (amount, recipient_id))
+    if cur.rowcount == 0:
+        raise RecipientNotFound()
+    cur.execute('INSERT INTO point_ledger (sender_id, recipient_id, amount) VALUES (?, ?, ?)',
+                (sender_id, recipient_id, amount))
+    return cur.lastrowid
+
+
+def transfer(conn, sender_id, recipient_id, amount):
+    # 원장 id 반환
+    def run(cur):
+        _debit(cur, sender_id, amount)
+        return _credit(cur, sender_id, recipient_id, amount)
+    return with_retries(conn, run)
+
+
+def transfer_batch(conn, sender_id, transfers):
+    # [(recipient_id, amount), ...] 를 한 트랜잭션으로 처리. 하나라도 실패하면 전부 취소
+    if not transfers or len(transfers) > MAX_BATCH_SIZE:
+        raise TransferError(f'한 번에 1~{MAX_BATCH_SIZE}건까지 송금할 수 있습니다.')
+    if any(amount <= 0 for _, amount in transfers):
+        raise TransferError('올바른 수신자와 금액을 입력해주세요.')
+
+    def run(cur):
+        _debit(cur, sender_id, sum(amount for _, amount in transfers))
+        return [_credit(cur, sender_id, recipient_id, amount) for recipient_id, amount in transfers]
+    return with_retries(conn, run)
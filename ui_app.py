@@ -1,8 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for
-import requests
+from flask import Flask, render_template, request, redirect, url_for, jsonify, Response, stream_with_context
+import os
+import backend_client
+import encoding
+from backend_client import BackendClient, LRUCache
+from uploads import add_cache_headers, variant_url
 
 app = Flask(__name__)
 API_BASE_URL = 'http://127.0.0.1:5000'  # Flask 백엔드 주소
+# Socket.IO 워커 주소 목록 (run_workers.py 로 여러 워커를 띄운 경우 쉼표로 구분)
+SOCKETIO_URLS = os.environ.get('TINYSHOP_SOCKETIO_URLS', API_BASE_URL).split(',')
+backend = BackendClient(API_BASE_URL)
+# (요청 경로, 백엔드 ETag) 별로 렌더링된 HTML 을 보관
+rendered_pages = LRUCache()
+
+app.jinja_env.filters['variant_url'] = variant_url
+
+@app.before_request
+def forward_client_ip():
+    backend_client.client_ip.set(request.remote_addr)
+
+@app.after_request
+def upload_cache_headers(response):
+    return add_cache_headers(response, request.path)
+
+@app.after_request
+def compress_response(response):
+    return encoding.compress_response(response, request)
+
+def render_cached(etag, template, **context):
+    # 백엔드 데이터가 그대로면(ETag 동일) 다시 렌더링하지 않는다
+    if not etag:
+        return render_template(template, **context)
+    key = (request.full_path, etag)
+    html = rendered_pages.get(key)
+    if html is None:
+        html = render_template(template, **context)
+        rendered_pages.put(key, html)
+    return html
 
 # 공통 토큰 검사 함수
 def require_token():
@@ -21,7 +55,7 @@ def login():
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
-        res = requests.post(f'{API_BASE_URL}/login', json={'email': email, 'password': password})
+        res = backend.post('/login', json={'email': email, 'password': password})
         result = res.json()
         if result.get('success'):
             token = result.get('token')
@@ -36,7 +70,7 @@ def register():
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
-        res = requests.post(f'{API_BASE_URL}/register', json={'email': email, 'password': password})
+        res = backend.post('/register', json={'email': email, 'password': password})
         result = res.json()
         if result.get('success'):
             message = '회원가입 성공! 로그인 해주세요.'
@@ -48,35 +82,56 @@ def register():
 def item_list():
     token = require_token()
     if not isinstance(token, str): return token
-    headers = {'Authorization': f'Bearer {token}'}
-    res = requests.get(f'{API_BASE_URL}/items', headers=headers)
-    items = res.json()
-    return render_template('items.html', items=items, request=request, token=token)
+    q = request.args.get('q', '').strip()
+    params = {
+        'fields': 'id,title,price',
+        'sort': request.args.get('sort', 'newest'),
+        'cursor': request.args.get('cursor', ''),
+    }
+    if q:
+        params['q'] = q
+        result, etag = backend.get_cached('/items/search', token, params=params)
+    else:
+        result, etag = backend.get_cached('/items', token, params=params)
+    return render_cached(etag, 'items.html', items=result.get('items', []), next_cursor=result.get('next_cursor'),
+                         sort=params['sort'], q=q, request=request, token=token)
+
+SELLER_ITEMS_PREVIEW = 5
 
 @app.route('/items/<int:item_id>')
 def item_detail(item_id):
     token = require_token()
     if not isinstance(token, str): return token
-    headers = {'Authorization': f'Bearer {token}'}
-    res = requests.get(f'{API_BASE_URL}/items/{item_id}', headers=headers)
-    result = res.json()
-    if result.get('success'):
-        return render_template('item_detail.html', item=result['item'], token=token)
-    else:
+    result, etag = backend.get_cached(f'/items/{item_id}', token)
+    if not result.get('success'):
         return f"에러: {result.get('error')}", 404
+    item = result['item']
+    # 판매자의 다른 상품은 상품마다 따로 조회하지 않고 판매자 목록 API 한 번으로
+    seller, seller_etag = backend.get_cached(f"/users/{item['seller_id']}/items", token,
+                                             params={'fields': 'id,title,price', 'limit': SELLER_ITEMS_PREVIEW + 1})
+    seller_items = [i for i in seller.get('items', []) if i['id'] != item_id][:SELLER_ITEMS_PREVIEW]
+    return render_cached(f'{etag}|{seller_etag}', 'item_detail.html', item=item, seller_items=seller_items, token=token)
+
+@app.route('/sellers/<int:seller_id>/items')
+def seller_items(seller_id):
+    token = require_token()
+    if not isinstance(token, str): return token
+    params = {'fields': 'id,title,price', 'cursor': request.args.get('cursor', '')}
+    result, etag = backend.get_cached(f'/users/{seller_id}/items', token, params=params)
+    return render_cached(etag, 'seller_items.html', items=result.get('items', []), next_cursor=result.get('next_cursor'),
+                         seller_id=seller_id, token=token)
 
 @app.route('/items/<int:item_id>/edit', methods=['GET', 'POST'])
 def edit_item(item_id):
     token = require_token()
     if not isinstance(token, str): return token
-    headers = {'Authorization': f'Bearer {token}'}
     if request.method == 'POST':
         data = {
             'price': request.form['price']
         }
-        requests.put(f'{API_BASE_URL}/items/{item_id}', headers=headers, json=data)
+        backend.put(f'/items/{item_id}', token, json=data)
         return redirect(url_for('item_detail', item_id=item_id, token=token))
-    res = requests.get(f'{API_BASE_URL}/items/{item_id}', headers=headers)
+    res = backend.get(f'/items/{item_id}', token)
     item = res.json().get('item', {})
     return render_template('item_edit.html', item=item, token=token)
 
@@ -84,8 +139,7 @@ def edit_item(item_id):
 def delete_item(item_id):
     token = require_token()
     if not isinstance(token, str): return token
-    headers = {'Authorization': f'Bearer {token}'}
-    requests.delete(f'{API_BASE_URL}/items/{item_id}', headers=headers)
+    backend.delete(f'/items/{item_id}', token)
     return redirect(url_for('item_list', token=token))
 
 @app.route('/items/new', methods=['GET', 'POST'])
@@ -98,11 +152,13 @@ def new_item():
             'description': request.form['description'],
             'price': request.form['price']
         }
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-        requests.post(f'{API_BASE_URL}/items', headers=headers, json=data)
+        image = request.files.get('image')
+        if image and image.filename:
+            # 이미지는 메모리에 올리지 않고 스트림 그대로 API 로 전달
+            backend.post('/items', token, data=data,
+                         files={'image': (image.filename, image.stream, image.mimetype)})
+        else:
+            backend.post('/items', token, json=data)
         return redirect(url_for('item_list', token=token))
     return render_template('item_form.html', token=token)
 
@@ -111,13 +167,24 @@ def chat(target_user_id):
     token = require_token()
     if not isinstance(token, str): return token
 
-    headers = {'Authorization': f'Bearer {token}'}
-    res = requests.get(f'{API_BASE_URL}/me', headers=headers)
-    user = res.json().get('user')
+    # 사용자 정보와 최근 대화 내역을 동시에 요청
+    me_res, history_res, config_res = backend.fan_out(
+        ('GET', '/me', {'token': token}),
+        ('GET', f'/chat/{target_user_id}/history', {'token': token}),
+        ('GET', '/config', {}),
+    )
+    user = me_res.json().get('user')
     if not user:
         return "유저 정보 확인 실패", 401
     sender_id = user['id']
-    return render_template('chat.html', sender_id=sender_id, receiver_id=target_user_id)
+    history = history_res.json().get('messages', []) if history_res.ok else []
+    # 같은 사용자는 항상 같은 워커에 연결 (sticky session)
+    socket_url = SOCKETIO_URLS[sender_id % len(SOCKETIO_URLS)]
+    # 클라이언트 파서는 API 서버가 알려준 직렬화 방식에 맞춘다 (UI 서버 환경변수와 무관)
+    socket_serializer = config_res.json().get('socketio_serializer', 'default') if config_res.ok else 'default'
+    return render_template('chat.html', sender_id=sender_id, receiver_id=target_user_id, socket_url=socket_url,
+                           socket_serializer=socket_serializer,
+                           history=history, token=token)
 
 @app.route('/transfer', methods=['GET', 'POST'])
 def transfer():
@@ -127,8 +194,7 @@ def transfer():
     if request.method == 'POST':
         recipient_id = int(request.form['recipient_id'])
         amount = int(request.form['amount'])
-        headers = {'Authorization': f'Bearer {token}'}
-        res = requests.post(f'{API_BASE_URL}/transfer', headers=headers, json={
+        res = backend.post('/transfer', token, json={
             'recipient_id': recipient_id,
             'amount': amount
         })
@@ -144,8 +210,7 @@ def report():
         target_user_id = request.form.get('target_user_id')
         target_item_id = request.form.get('target_item_id')
         reason = request.form.get('reason')
-        headers = {'Authorization': f'Bearer {token}'}
-        res = requests.post(f'{API_BASE_URL}/report', headers=headers, json={
+        res = backend.post('/report', token, json={
             'target_user_id': int(target_user_id) if target_user_id else None,
             'target_item_id': int(target_item_id) if target_item_id else None,
             'reason': reason
@@ -153,16 +218,51 @@ def report():
         message = res.json().get('message', res.json().get('error'))
     return render_template('report.html', token=token, message=message)
 
+ADMIN_USER_FILTERS = ('suspended', 'admin', 'email_prefix', 'min_points', 'max_points', 'cursor')
+
 @app.route('/admin/users')
 def admin_users():
     token = require_token()
     if not isinstance(token, str): return token
-    headers = {'Authorization': f'Bearer {token}'}
-    res = requests.get(f'{API_BASE_URL}/admin/users', headers=headers)
+    # 필터 값은 그대로 API 에 넘기고, 목록과 대시보드 요약은 동시에 요청
+    filters = {k: v for k, v in request.args.items() if k in ADMIN_USER_FILTERS and v}
+    res, summary_res = backend.fan_out(
+        ('GET', '/admin/users', {'token': token, 'params': filters}),
+        ('GET', '/admin/summary', {'token': token}),
+    )
     if res.status_code == 403:
         return "관리자 권한이 필요합니다.", 403
-    users = res.json()
-    return render_template('admin_users.html', users=users, token=token)
+    data = res.json()
+    if not data.get('success'):
+        return data.get('error', '사용자 목록을 불러올 수 없습니다.'), res.status_code
+    summary = summary_res.json() if summary_res.ok else {}
+    reported_items = summary.get('top_reported', {}).get('item', [])
+    if reported_items:
+        # 신고 많은 상품의 제목은 배치 조회 한 번으로 채운다 (삭제된 상품은 missing)
+        ids = ','.join(str(t['target_id']) for t in reported_items)
+        batch = backend.get('/items/batch', token, params={'ids': ids}).json()
+        titles = {i['id']: i['title'] for i in batch.get('items', [])}
+        for target in reported_items:
+            target['title'] = titles.get(target['target_id'])
+    # 링크의 쿼리 문자열은 url_for 가 인코딩한다 (필터 값에 &, # 등이 있어도 안전)
+    search = {k: v for k, v in filters.items() if k != 'cursor'}
+    next_url = url_for('admin_users', token=token, **search, cursor=data['next_cursor']) if data['next_cursor'] else None
+    return render_template('admin_users.html', users=data['users'], next_cursor=data['next_cursor'],
+                           filters=filters, summary=summary, token=token,
+                           export_url=url_for('admin_users_export', token=token, **search), next_url=next_url)
+
+@app.route('/admin/users/export.csv')
+def admin_users_export():
+    token = require_token()
+    if not isinstance(token, str): return token
+    # API 응답을 받는 대로 흘려보낸다 (전체 CSV 를 UI 서버 메모리에 올리지 않음)
+    filters = {k: v for k, v in request.args.items() if k in ADMIN_USER_FILTERS and v}
+    res = backend.get('/admin/users/export.csv', token, params=filters, stream=True)
+    if res.status_code != 200:
+        res.close()
+        return "사용자 목록을 내보낼 수 없습니다.", res.status_code
+    return Response(stream_with_context(res.iter_content(64 * 1024)), mimetype='text/csv',
+                    headers={'Content-Disposition': res.headers.get('Content-Disposition', 'attachment; filename=users.csv')})
 
 @app.route('/transfer')
 def transfer_form():
@@ -171,6 +271,16 @@ def transfer_form():
         return token
     return render_template('transfer.html', token=token)
 
+@app.route('/_backend_stats')
+def backend_stats():
+    # API 엔드포인트별 호출 수/지연 시간 (관리자만)
+    token = require_token()
+    if not isinstance(token, str): return token
+    res = backend.get('/me', token)
+    if not res.ok or not res.json().get('user', {}).get('is_admin'):
+        return "관리자 권한이 필요합니다.", 403
+    return jsonify(backend.stats())
+
 
 if __name__ == '__main__':
     app.run(port=5500, debug=True)
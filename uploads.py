@@ -0,0 +1,196 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 가 없으면 썸네일 생성만 건너뛴다
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'static/uploads')
+UPLOAD_URL_PREFIX = '/static/uploads'
+MAX_UPLOAD_BYTES = int(os.environ.get('TINYSHOP_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# 썸네일/리사이즈 변형 너비와 작업 스레드 수
+VARIANT_WIDTHS = (200, 800)
+THUMBNAIL_WORKERS = int(os.environ.get('TINYSHOP_THUMBNAIL_WORKERS', '2'))
+# 업로드 파일은 내용 해시로 이름이 정해지므로 URL 이 절대 바뀌지 않는다
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 해시 이름 파일(과 그 변형)만 immutable 로 캐시한다: /static/uploads/ab/<sha256>[_w200].png
+HASHED_UPLOAD_PATH = re.compile(re.escape(UPLOAD_URL_PREFIX) + r'/([0-9a-f]{2})/\1[0-9a-f]{62}(_w\d+)?\.[a-z]+')
+
+# 파일 시그니처로 형식을 판별 (파일명 확장자는 믿지 않음)
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+class UploadError(Exception):
+    pass
+
+
+def sniff_extension(head):
+    for signature, ext in SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def relative_path(digest, ext, width=None):
+    suffix = f'_w{width}' if width else ''
+    return f'{digest[:2]}/{digest}{suffix}.{ext}'
+
+
+def variant_url(image_url, width):
+    # /static/uploads/ab/abcd.png -> /static/uploads/ab/abcd_w200.png
+    if not image_url or not image_url.startswith(UPLOAD_URL_PREFIX):
+        return image_url
+    base, ext = os.path.splitext(image_url)
+    return f'{base}_w{width}{ext}'
+
+
+def store_upload(stream, folder=UPLOAD_FOLDER, max_bytes=MAX_UPLOAD_BYTES):
+    # 청크 단위로 임시 파일에 쓰면서 SHA-256 을 계산하고, 같은 내용이 이미 있으면 재사용한다.
+    # (상대 경로, 새로 저장했는지) 반환
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if ext is None:
+                    ext = sniff_extension(chunk[:16])
+                    if ext is None:
+                        raise UploadError('지원하지 않는 이미지 형식입니다.')
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError('이미지 파일이 너무 큽니다.')
+                digest.update(chunk)
+                out.write(chunk)
+        if ext is None:
+            raise UploadError('빈 파일입니다.')
+        rel = relative_path(digest.hexdigest(), ext)
+        dest = os.path.join(folder, rel)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+            return rel, False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp_path, dest)
+        return rel, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def make_variants(path, widths=VARIANT_WIDTHS):
+    if Image is None:
+        return
+    base, ext = os.path.splitext(path)
+    try:
+        with Image.open(path) as img:
+            for width in widths:
+                dest = f'{base}_w{width}{ext}'
+                if os.path.exists(dest):
+                    continue
+                variant = img.copy()
+                variant.thumbnail((width, width * 10))
+                # 다른 작업과 겹치지 않도록 고유한 임시 파일에 저장 후 교체
+                tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(dest), prefix='.variant-', delete=False)
+                try:
+                    with tmp:
+                        variant.save(tmp, format=img.format)
+                    os.replace(tmp.name, dest)
+                except BaseException:
+                    if os.path.exists(tmp.name):
+                        os.remove(tmp.name)
+                    raise
+    except Exception:
+        logger.exception('failed to create image variants for %s', path)
+
+
+thumbnail_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnail')
+
+
+def save_image(file, folder=UPLOAD_FOLDER):
+    # 업로드를 저장하고 썸네일 생성을 백그라운드로 넘긴 뒤 이미지 URL 을 돌려준다
+    rel, created = store_upload(file.stream, folder)
+    if created:
+        thumbnail_pool.submit(make_variants, os.path.join(folder, rel))
+    return f'{UPLOAD_URL_PREFIX}/{rel}'
+
+
+def add_cache_headers(response, path):
+    if response.status_code == 200 and HASHED_UPLOAD_PATH.fullmatch(path):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def disk_usage(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def sample_images(count, width=1600, height=1200):
+    # 압축이 잘 안 되는 노이즈 이미지 (실제 사진 크기에 가깝게)
+    if Image is None:
+        return [b'\x89PNG\r\n\x1a\n' + os.urandom(width * height // 4) for _ in range(count)]
+    images = []
+    for i in range(count):
+        out = io.BytesIO()
+        Image.effect_noise((width, height), 32 + i).convert('RGB').save(out, format='JPEG', quality=85)
+        images.append(out.getvalue())
+    return images
+
+
+def benchmark(uploads=200, distinct=20, clients=16):
+    # 동시 업로드 처리량/지연과 중복 이미지가 섞였을 때 디스크 사용량: python uploads.py [업로드 수] [서로 다른 이미지 수]
+    images = sample_images(distinct)
+    payloads = [images[i % distinct] for i in range(uploads)]
+    uploaded = sum(len(p) for p in payloads)
+    with tempfile.TemporaryDirectory() as folder:
+        variants = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        pending = []
+
+        def upload(payload):
+            start = time.perf_counter()
+            rel, created = store_upload(io.BytesIO(payload), folder)
+            if created:
+                pending.append(variants.submit(make_variants, os.path.join(folder, rel)))
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            latencies = sorted(pool.map(upload, payloads))
+        elapsed = time.perf_counter() - start
+        wait(pending)
+        variants_elapsed = time.perf_counter() - start
+        variants.shutdown()
+        originals = sum(len(image) for image in images)
+        print(f'{uploads} uploads ({distinct} distinct, {uploaded / 2 ** 20:.1f} MiB) from {clients} clients')
+        print(f'  store: {uploads / elapsed:.1f} uploads/s, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms'
+              f'  p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+        print(f'  variants done after {variants_elapsed:.1f}s ({THUMBNAIL_WORKERS} workers)')
+        print(f'  disk: {disk_usage(folder) / 2 ** 20:.1f} MiB (originals {originals / 2 ** 20:.1f} MiB + variants),'
+              f' one file per upload would be {uploaded / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))